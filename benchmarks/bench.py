@@ -0,0 +1,328 @@
+"""
+Benchmarks for the parsing pipeline.
+
+Usage:
+
+    python benchmarks/bench.py [--repos REPOS | --synthetic SCALE] [-k NAME]
+                               [--repeat 5] [--min-time 0.2]
+                               [--output results.json] [--baseline baseline.json] [--tolerance 0.2]
+
+Micro-benchmarks time the parser functions on inputs harvested from the volumes in
+REPOS/raw (defaults to the test fixture) - or in a synthetic corpus of the given scale, see
+`pytlopo.synthetic` - macro-benchmarks time parsing whole volumes.
+
+Each benchmark is run often enough for a sample to take at least MIN_TIME seconds, and the best of
+REPEAT samples is reported. Results can be written to a JSON file and compared against such a file
+stored earlier; the exit status is 1 if the best time of a benchmark got slower than the baseline by
+more than the tolerance.
+
+String hashing is randomized per process, which makes timings vary by 20% and more between runs.
+So unless PYTHONHASHSEED is set, the benchmarks are run in a subprocess with a fixed seed.
+"""
+import gc
+import os
+import sys
+import json
+import time
+import tempfile
+import pathlib
+import platform
+import subprocess
+import argparse
+import statistics
+import collections
+
+from csvw.dsv import reader
+from pycldf.sources import Source, Sources
+
+from pytlopo.config import proto_pattern
+from pytlopo.models import Volume, copy_source
+from pytlopo.parser import forms
+from pytlopo.parser.lines import extract_blocks
+from pytlopo import util
+from pytlopo.synthetic import generate
+
+REPOS = pathlib.Path(__file__).parent.parent / 'tests' / 'repos'
+BENCHMARKS = collections.OrderedDict()
+
+
+def benchmark(group):
+    """
+    Registers a benchmark. A benchmark is a function accepting a `Context` and returning the
+    callable to be timed; i.e. the setup done in the function itself is not timed.
+    """
+    def decorator(func):
+        BENCHMARKS['{}.{}'.format(group, func.__name__)] = func
+        return func
+    return decorator
+
+
+class Context:
+    def __init__(self, repos):
+        self.repos = repos
+        self.langs = {r['Name']: r for r in reader(repos / 'etc' / 'languages.csv', dicts=True)}
+        self.bib = Source.from_bibtex('@book{vol,\nauthor={A B},\ntitle={T}\n}')
+        self.sources = Sources.from_file(repos / 'etc' / 'sources.bib')
+        self.volume_dirs = sorted(p.parent for p in (repos / 'raw').glob('vol*/md.json'))
+        self.lines = []
+        for d in self.volume_dirs:
+            self.lines.extend(d.joinpath('text.txt').read_text(encoding='utf8').split('\n'))
+
+        self.protoforms, self.glosses = [], []
+        for _, _, _, _, block in extract_blocks(self.lines, factory=lambda lines: lines):
+            for line in block:
+                m = proto_pattern.match(line)
+                if m:
+                    self.protoforms.append((line[m.end():].strip(), m.group('pl')))
+                elif ':' in line:
+                    quotes = [i for i in (line.find("'"), line.find('‘')) if i > -1]
+                    if quotes:
+                        self.glosses.append(line[min(quotes):])
+        self.refs = []
+        for src in self.sources:
+            if src.get('key'):
+                self.refs.extend([src['key'], '(after {}: 12-15)'.format(src['key'])])
+        self.refs.append('Unknown 1900')
+
+    def volume(self, d=None, **kw):
+        return Volume(
+            d or self.volume_dirs[0], self.langs, copy_source(self.bib), self.sources, **kw)
+
+
+@benchmark('micro')
+def graphemes(ctx):
+    forms.graphemes.cache_clear()
+    words = [w for line in ctx.lines for w in line.split()]
+
+    def run():
+        for w in words:
+            forms.graphemes(w)
+    return run
+
+
+@benchmark('micro')
+def parse_protoform(ctx):
+    forms.graphemes.cache_clear()
+
+    def run():
+        for f, pl in ctx.protoforms:
+            forms.parse_protoform(f, pl)
+    return run
+
+
+@benchmark('micro')
+def iter_glosses(ctx):
+    def run():
+        for s in ctx.glosses:
+            list(forms.iter_glosses(s))
+    return run
+
+
+@benchmark('micro')
+def variants(ctx):
+    util._variants.cache_clear()
+    util._split_variants.cache_clear()
+    fs = [f for f, _ in ctx.protoforms]
+
+    def run():
+        for f in fs:
+            util.variants(f.split()[0])
+    return run
+
+
+@benchmark('micro')
+def match_ref(ctx):
+    vol = ctx.volume()
+    vol.source_in_brackets_index  # Build the index outside of the timed code.
+
+    def run():
+        for s in ctx.refs:
+            vol.match_ref(s)
+    return run
+
+
+@benchmark('micro')
+def replace_refs(ctx):
+    vol = ctx.volume()
+    vol.source_mention_index  # Build the index outside of the timed code.
+
+    def run():
+        for line in ctx.lines:
+            vol.replace_refs(line)
+    return run
+
+
+@benchmark('macro')
+def reconstructions(ctx):
+    vols = [ctx.volume(d) for d in ctx.volume_dirs]
+
+    def run():
+        for vol in vols:
+            assert vol.reconstructions is not None
+    return run
+
+
+@benchmark('macro')
+def chapters(ctx):
+    vols = [ctx.volume(d) for d in ctx.volume_dirs]
+
+    def run():
+        for vol in vols:
+            assert vol.chapters is not None
+    return run
+
+
+@benchmark('macro')
+def iter_objects(ctx):
+    vols = [ctx.volume(d) for d in ctx.volume_dirs]
+
+    def run():
+        for vol in vols:
+            for _ in vol.iter_objects():
+                pass
+    return run
+
+
+def sample(func, ctx, number):
+    """
+    :return: The time taken by `number` runs of a benchmark - re-doing the untimed setup for \
+    each run. Garbage collection is disabled for the whole sample, so that collections triggered \
+    by the setup do not interfere with the timed code.
+    """
+    total = 0
+    gc.collect()
+    gcold = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(number):
+            f = func(ctx)
+            start = time.perf_counter()
+            f()
+            total += time.perf_counter() - start
+    finally:
+        if gcold:
+            gc.enable()
+    return total
+
+
+def autorange(func, ctx, min_time):
+    """
+    As in `timeit.Timer.autorange`, the number of runs per sample is increased - 1, 2, 5, 10,
+    20, ... - until a sample takes at least `min_time` seconds, so that timer resolution and
+    noise do not dominate short benchmarks.
+
+    :return: Pair (number of runs per sample, time taken by the last sample).
+    """
+    i = 1
+    while True:
+        for j in (1, 2, 5):
+            number = i * j
+            total = sample(func, ctx, number)
+            if total >= min_time:
+                return number, total
+        i *= 10
+
+
+def timed(benchmarks, ctx, repeat, min_time):
+    """
+    Time `repeat` samples of each benchmark. The samples of the benchmarks are taken round-robin,
+    so that a period of load on the machine affects only a few samples of each benchmark.
+
+    :return: `dict` mapping benchmark names to the best and the median time of a single run.
+    """
+    numbers, times = {}, collections.defaultdict(list)
+    for name, func in benchmarks.items():
+        numbers[name], total = autorange(func, ctx, min_time)
+        times[name].append(total / numbers[name])
+    for _ in range(repeat - 1):
+        for name, func in benchmarks.items():
+            times[name].append(sample(func, ctx, numbers[name]) / numbers[name])
+    return collections.OrderedDict(
+        (name, dict(
+            min=min(times[name]),
+            median=statistics.median(times[name]),
+            number=numbers[name],
+            repeat=repeat))
+        for name in benchmarks)
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare the best times, which are much less affected by noise than the medians.
+
+    :return: List of names of the benchmarks which regressed.
+    """
+    regressions = []
+    for name, res in results.items():
+        if name in baseline:
+            ratio = res['min'] / baseline[name]['min']
+            flag = ''
+            if ratio > 1 + tolerance:
+                regressions.append(name)
+                flag = '  REGRESSION'
+            print('{:<30} {:>10.3f} {:>10.3f} {:>7.2f}x{}'.format(
+                name, baseline[name]['min'] * 1000, res['min'] * 1000, ratio, flag))
+    return regressions
+
+
+def main(args=None):
+    if args is None and 'PYTHONHASHSEED' not in os.environ:
+        sys.exit(subprocess.call(
+            [sys.executable] + sys.argv, env=dict(os.environ, PYTHONHASHSEED='0')))
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--repos', type=pathlib.Path, default=REPOS)
+    parser.add_argument(
+        '--synthetic', type=int, metavar='SCALE',
+        help='Run the benchmarks on a synthetic corpus of this scale.')
+    parser.add_argument(
+        '-k', dest='select', action='append', default=[],
+        help='Only run benchmarks with a name containing this string.')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of samples.')
+    parser.add_argument(
+        '--min-time', type=float, default=0.2,
+        help='Minimal duration of a sample in seconds.')
+    parser.add_argument('--output', type=pathlib.Path, help='Write the results to this JSON file.')
+    parser.add_argument('--baseline', type=pathlib.Path, help='Compare with results in this file.')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help='Relative slowdown of the best time tolerated before reporting a regression.')
+    args = parser.parse_args(args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            args.repos = pathlib.Path(tmp)
+            generate(args.repos, scale=args.synthetic)
+        results = timed(
+            collections.OrderedDict(
+                (name, func) for name, func in BENCHMARKS.items()
+                if (not args.select) or any(s in name for s in args.select)),
+            Context(args.repos),
+            args.repeat,
+            args.min_time)
+    for name, res in results.items():
+        print('{:<30} {:>10.3f}ms (median {:.3f}ms, {} runs per sample)'.format(
+            name, res['min'] * 1000, res['median'] * 1000, res['number']))
+    if args.synthetic:
+        args.repos = 'synthetic:{}'.format(args.synthetic)
+
+    if args.output:
+        args.output.write_text(json.dumps(dict(
+            python=platform.python_version(),
+            platform=platform.platform(),
+            hashseed=os.environ.get('PYTHONHASHSEED'),
+            repos=str(args.repos),
+            benchmarks=results,
+        ), indent=2), encoding='utf8')
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf8'))
+        if baseline['repos'] != str(args.repos):
+            print('\nWARNING: baseline was measured on {}'.format(baseline['repos']))
+        print('\n{:<30} {:>10} {:>10} {:>8}'.format('[ms]', 'baseline', 'best', 'ratio'))
+        if compare(results, baseline['benchmarks'], args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Memory footprint of a fully loaded corpus.
+
+Usage:
+
+    python benchmarks/memory.py [REPOS]
+
+where REPOS is a directory containing `raw/vol<N>/` and `etc/` (defaults to the test fixture).
+Reports the memory allocated for the parsed volumes, as measured with `tracemalloc`, and the
+number and per-instance size of the small model objects.
+"""
+import gc
+import sys
+import pathlib
+import argparse
+import tracemalloc
+import collections
+
+from csvw.dsv import reader
+from pycldf.sources import Source, Sources
+
+from pytlopo.corpus import Corpus
+from pytlopo.models import Form, Gloss
+
+REPOS = pathlib.Path(__file__).parent.parent / 'tests' / 'repos'
+
+
+def instance_size(obj):
+    """
+    Shallow size of an object, including its instance `__dict__` - if it has one.
+    """
+    return sys.getsizeof(obj) + (sys.getsizeof(obj.__dict__) if hasattr(obj, '__dict__') else 0)
+
+
+def iter_small_objects(corpus):
+    for vol in corpus:
+        for rec in vol.reconstructions:
+            for form in rec.reflexes + [f for _, cf in rec.cfs or [] for f in cf]:
+                yield form
+                yield from form.glosses or []
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('repos', nargs='?', type=pathlib.Path, default=REPOS)
+    args = parser.parse_args(args)
+
+    langs = {r['Name']: r for r in reader(args.repos / 'etc' / 'languages.csv', dicts=True)}
+    bib = Source.from_bibtex('@book{vol,\nauthor={A B},\ntitle={T}\n}')
+    sources = Sources.from_file(args.repos / 'etc' / 'sources.bib')
+
+    gc.collect()
+    tracemalloc.start()
+    corpus = Corpus(args.repos / 'raw', langs, bib, sources, workers=1)
+    for vol in corpus:
+        assert vol.reconstructions is not None
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    counts, sizes = collections.Counter(), collections.Counter()
+    for obj in iter_small_objects(corpus):
+        assert isinstance(obj, (Form, Gloss))
+        counts[type(obj).__name__] += 1
+        sizes[type(obj).__name__] += instance_size(obj)
+
+    print('Python {}'.format(sys.version.split()[0]))
+    print('allocated: {:.1f} MiB (peak {:.1f} MiB)'.format(current / 2**20, peak / 2**20))
+    for name, count in sorted(counts.items()):
+        print('{}: {} instances, {} bytes each'.format(name, count, sizes[name] // count))
+
+
+if __name__ == '__main__':
+    main()
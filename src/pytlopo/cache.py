@@ -0,0 +1,99 @@
+"""
+A persistent, content-addressed cache for the results of parsing a volume.
+
+Entries are keyed on a hash of all inputs of the parser, i.e. the volume text and metadata, the
+language table, the bibliography and the source code of `pytlopo` - which includes the grapheme,
+language and subgroup inventories in `pytlopo.config`. Thus, any change to the inputs invalidates
+the cached results automatically.
+
+Besides the results for a complete volume, the cache holds entries for
+- the parse results of the chunks of text for each chapter and
+- the rendered chapters,
+so that after editing one chapter, only this chapter needs to be parsed again.
+"""
+import os
+import json
+import pickle
+import hashlib
+import pathlib
+
+import pytlopo
+
+__all__ = ['Cache', 'fingerprint', 'digest']
+
+# Bump to invalidate all existing cache entries, e.g. when the pickled format changes.
+CACHE_VERSION = 3
+
+
+def _update(hash, obj):
+    hash.update(json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str).encode('utf8'))
+
+
+def digest(*objs) -> str:
+    """
+    Compute a hash of JSON serializable objects.
+    """
+    res = hashlib.sha256()
+    for obj in objs:
+        _update(res, obj)
+    return res.hexdigest()
+
+
+def fingerprint(vol, text=True) -> str:
+    """
+    Compute a hash of all inputs to the parsing of a volume.
+
+    :param text: Flag signaling whether to include the volume text.
+    """
+    res = hashlib.sha256()
+    _update(res, [CACHE_VERSION, vol.num])
+    if text:
+        res.update(vol.dir.joinpath('text.txt').read_bytes())
+    _update(res, vol.metadata)
+    _update(res, vol.chapter_pages)
+    # Whether map images exist determines how figure captions are rendered:
+    _update(res, sorted(p.name for p in vol.dir.glob('maps/*')))
+    _update(res, vol.langs)
+    _update(res, [vol._bib.genre, vol._bib.id, list(vol._bib.items())])
+    for src in vol.sources:
+        res.update(src.bibtex().encode('utf8'))
+    for p in sorted(pathlib.Path(pytlopo.__file__).parent.glob('**/*.py')):
+        res.update(p.read_bytes())
+    return res.hexdigest()
+
+
+class Cache:
+    """
+    A directory holding pickled entries of different types per volume.
+    """
+    def __init__(self, d):
+        self.dir = pathlib.Path(d)
+
+    def _path(self, vol, type_, key):
+        return self.dir / 'vol{}.{}.{}.pickle'.format(vol.num, type_, key)
+
+    def load(self, vol, type_, key):
+        p = self._path(vol, type_, key)
+        if p.exists():
+            try:
+                with p.open('rb') as f:
+                    return pickle.load(f)
+            except (EOFError, pickle.UnpicklingError):  # pragma: no cover
+                return None
+
+    def dump(self, vol, type_, key, obj):
+        p = self._path(vol, type_, key)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = p.parent / (p.name + '.tmp{}'.format(os.getpid()))
+        with tmp.open('wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(p)  # Atomic, so concurrent readers never see a partial entry.
+
+    def prune(self, vol, type_, keep):
+        """
+        Remove all entries of a type for a volume, except the ones with keys in `keep`.
+        """
+        keep = {self._path(vol, type_, key) for key in keep}
+        for p in self.dir.glob('vol{}.{}.*.pickle'.format(vol.num, type_)):
+            if p not in keep:
+                p.unlink()
@@ -1,5 +1,7 @@
 import re
 
+from pytlopo.util import Trie
+
 SUB = [
     '₊₁',
     '₋₁',
@@ -216,6 +218,42 @@ PROTO = {
     "Proto North Mainland/D’Entrecasteaux": [],
 }
 
+
+class Inventory(frozenset):
+    """
+    A set of graphemes, compiled once for constant time membership tests.
+
+    >>> PROTO_INVENTORIES['POc'].invalid(['k', 'a', 'ʔ'])
+    ['ʔ']
+    """
+    def invalid(self, graphemes) -> list:
+        """
+        :param graphemes: Iterable of graphemes, e.g. a segmented form.
+        :return: List of the graphemes which are not in the inventory.
+        """
+        return [g for g in graphemes if g not in self]
+
+    def validate(self, forms) -> dict:
+        """
+        Bulk validation of segmented forms.
+
+        :param forms: Iterable of iterables of graphemes.
+        :return: `dict` mapping (the string of) each invalid form to its invalid graphemes.
+        """
+        res = {}
+        for form in forms:
+            invalid = self.invalid(form)
+            if invalid:
+                res[''.join(form)] = invalid
+        return res
+
+
+# Graphemes allowed in reflexes:
+REFLEX_INVENTORY = Inventory(POC_GRAPHEMES + TRANSCRIPTION)
+# Graphemes allowed in the protoforms of each proto-language:
+PROTO_INVENTORIES = {
+    pl: Inventory(POC_GRAPHEMES + ['-'] + graphemes) for pl, graphemes in PROTO.items()}
+
 # FIXME: Map POS patterns to lists of mormalized POS symbols.
 POS = [
     'ADJ',
@@ -650,11 +688,32 @@ def re_choice(items):
     return r'|'.join(re.escape(i) for i in items)
 
 kinship_pattern = re.compile(r"’\s*(,\s+([♀♂]|\([♀♂]\?\))?({})( etc)?)+".format(re_choice(sorted(KINSHIP, key=lambda s: -len(s)))))
+# The alternations of protolanguage and group names are compiled from prefix trees, such that
+# matching does not backtrack over names sharing a prefix. Since no name is followed by one of its
+# extensions in matching text, this matches the same name as the plain alternation.
 proto_pattern = re.compile(r'(\((?P<relno>[0-9])\)\s*)?'
                            r'(?P<pl>({}))\s+'
                            r'(?P<root>root\s+)?'
                            r'(?P<pldoubt>\((POC)?\?\)\s*)?'
                            r'(?P<pos>\(({})\)\s*)?'
                            r'(?P<fn>\[[0-9]+]\s+)?'
-                           r'(?P<pfdoubt>\?)?†?\*'.format(re_choice(PROTO), re_choice(POS)))  # FIXME: record dagger!
-witness_pattern = re.compile(r'\s+({})(\s*:\s+)'.format(re_choice(GROUPS)))
+                           r'(?P<pfdoubt>\?)?†?\*'.format(Trie(PROTO).regex(), re_choice(POS)))  # FIXME: record dagger!
+witness_pattern = re.compile(r'\s+({})(\s*:\s+)'.format(Trie(dict.fromkeys(GROUPS)).regex()))
+PROTO_START = frozenset('(' + ''.join(pl[0] for pl in PROTO))
+
+
+def match_proto(line):
+    """
+    `proto_pattern.match`, rejecting lines without the first character or the `*` of a match
+    before running the regex.
+    """
+    if line[:1] in PROTO_START and '*' in line:
+        return proto_pattern.match(line)
+
+
+def match_witness(line):
+    """
+    `witness_pattern.match`, rejecting lines without the `:` of a match before running the regex.
+    """
+    if ':' in line:
+        return witness_pattern.match(line)
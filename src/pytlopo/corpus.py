@@ -0,0 +1,119 @@
+"""
+Parsing all volumes of TloPO.
+"""
+import pathlib
+import collections
+import concurrent.futures
+
+from clldutils import jsonlib
+
+from pytlopo.models import Volume, copy_source, chapter_page_ranges, FORM_CACHE_SIZE
+from pytlopo.metrics import Metrics
+from pytlopo.trace import Tracer
+
+__all__ = ['Corpus']
+
+
+def _parse(vol):
+    return vol.results()
+
+
+class Corpus:
+    """
+    The volumes of TloPO, parsed with shared language table, bibliography and metadata.
+
+    Usage:
+
+    >>> corpus = Corpus(repos / 'raw', langs, bib, sources, workers=4)
+    >>> for num, vol in corpus.volumes.items():
+    ...     print(num, len(vol.reconstructions))
+    """
+    def __init__(self,
+                 d,
+                 langs,
+                 bib,
+                 sources,
+                 workers=None,
+                 cache_dir=None,
+                 metrics=False,
+                 trace=False,
+                 form_cache_size=FORM_CACHE_SIZE):
+        """
+        :param d: Directory containing the `vol<N>` directories.
+        :param bib: Bibliographical record used as template for the record of each volume.
+        :param workers: Maximal number of worker processes used to parse the volumes; `None` \
+        means one per CPU, `1` means parsing all volumes in the current process.
+        :param cache_dir: Directory for a persistent cache of the parse results, see \
+        `pytlopo.cache`.
+        :param metrics: If `True`, per-stage metrics are recorded for each volume, see \
+        `pytlopo.metrics`.
+        :param trace: If `True`, spans of the pipeline are recorded for each volume, see \
+        `pytlopo.trace`.
+        :param form_cache_size: Size of the memo of parsed form lines of each volume, see `Volume`.
+        """
+        self.dir = pathlib.Path(d)
+        self.workers = workers
+        metadata = collections.OrderedDict(
+            (p.parent.name.replace('vol', ''), jsonlib.load(p))
+            for p in sorted(self.dir.glob('vol*/md.json'), key=lambda p: p.parent.name))
+        pages = chapter_page_ranges(metadata)
+        self._volumes = collections.OrderedDict(
+            (num, Volume(
+                self.dir / 'vol{}'.format(num),
+                langs,
+                copy_source(bib),
+                sources,
+                metadata=md,
+                chapter_pages=pages,
+                cache_dir=cache_dir,
+                metrics=metrics,
+                trace=trace,
+                form_cache_size=form_cache_size)) for num, md in metadata.items())
+
+    def __iter__(self):
+        return iter(self.volumes.values())
+
+    @property
+    def volumes(self) -> collections.OrderedDict:
+        """
+        Mapping of volume numbers to fully parsed `Volume` instances, in order of volume number.
+        """
+        self.parse()
+        return self._volumes
+
+    @property
+    def metrics(self) -> Metrics:
+        """
+        Metrics of all volumes, aggregated per stage - if recorded.
+        """
+        res = None
+        for vol in self.volumes.values():
+            if vol.metrics is not None:
+                res = res or Metrics()
+                res.update(vol.metrics)
+        return res
+
+    @property
+    def tracer(self) -> Tracer:
+        """
+        Tracer with the spans recorded for all volumes - if tracing is enabled.
+        """
+        res = None
+        for vol in self.volumes.values():
+            if vol.tracer is not None:
+                res = res or Tracer()
+                res.extend(vol.tracer.events)
+        return res
+
+    def parse(self):
+        todo = [vol for vol in self._volumes.values() if 'chapters' not in vol.__dict__]
+        if not todo:
+            return
+        if self.workers == 1 or len(todo) == 1:
+            results = [_parse(vol) for vol in todo]
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+                # `map` returns results in the order of the input, i.e. in volume order.
+                results = list(executor.map(_parse, todo))
+        for vol, res in zip(todo, results):
+            vol.load_results(res)
@@ -0,0 +1,113 @@
+"""
+Instrumentation of the parsing pipeline: wall time, calls, lines and objects per stage.
+
+>>> vol = Volume(d, langs, bib, sources, metrics=True)
+>>> _ = vol.chapters
+>>> print(vol.metrics)
+>>> vol.metrics.report()
+"""
+import time
+import typing
+import contextlib
+import dataclasses
+import collections
+
+from tabulate import tabulate
+
+__all__ = ['Metrics', 'Stage']
+
+
+@dataclasses.dataclass
+class Stage:
+    name: str
+    calls: int = 0
+    seconds: float = 0.0
+    lines: int = 0
+    objects: int = 0
+
+    @property
+    def lines_per_second(self) -> typing.Optional[float]:
+        return self.lines / self.seconds if self.lines and self.seconds else None
+
+    @property
+    def objects_per_second(self) -> typing.Optional[float]:
+        return self.objects / self.seconds if self.objects and self.seconds else None
+
+    def asdict(self) -> dict:
+        res = dataclasses.asdict(self)
+        res.update(
+            lines_per_second=self.lines_per_second, objects_per_second=self.objects_per_second)
+        return res
+
+
+class Metrics:
+    """
+    Aggregates the metrics of the stages of the pipeline, in order of first occurrence.
+    """
+    def __init__(self):
+        self.stages = collections.OrderedDict()
+
+    def add(self, stage, seconds, lines=0, objects=0, calls=1):
+        if stage not in self.stages:
+            self.stages[stage] = Stage(stage)
+        s = self.stages[stage]
+        s.calls += calls
+        s.seconds += seconds
+        s.lines += lines
+        s.objects += objects
+
+    def update(self, other: 'Metrics'):
+        for s in other.stages.values():
+            self.add(s.name, s.seconds, lines=s.lines, objects=s.objects, calls=s.calls)
+
+    @contextlib.contextmanager
+    def timer(self, stage, lines=0, objects=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, lines=lines, objects=objects)
+
+    def timed(self, stage, gen, lines=0):
+        """
+        Wrap generator `gen`, accumulating the time spent in it as one call of `stage`, where each
+        yielded item counts as object. Values sent to the wrapper and the return value of `gen`
+        are passed through.
+        """
+        seconds, objects, value = 0.0, 0, None
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = gen.send(value)
+                except StopIteration as e:
+                    return e.value
+                finally:
+                    seconds += time.perf_counter() - start
+                objects += 1
+                value = yield item
+        finally:
+            gen.close()
+            self.add(stage, seconds, lines=lines, objects=objects)
+
+    def counted(self, stage, lines):
+        """
+        Wrap iterable `lines`, adding the number of lines to those of `stage`.
+        """
+        n = 0
+        try:
+            for n, line in enumerate(lines, start=1):
+                yield line
+        finally:
+            self.add(stage, 0.0, lines=n, calls=0)
+
+    def report(self) -> typing.List[dict]:
+        return [s.asdict() for s in self.stages.values()]
+
+    def __str__(self):
+        return tabulate(
+            [[s.name, s.calls, s.seconds, s.lines or '', s.objects or '',
+              s.lines_per_second or '', s.objects_per_second or '']
+             for s in self.stages.values()],
+            headers=['stage', 'calls', 'seconds', 'lines', 'objects', 'lines/s', 'objects/s'],
+            floatfmt='.3f')
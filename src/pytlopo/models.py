@@ -1,24 +1,71 @@
 """
 
 """
+import os
 import re
+import sys
+import time
+import bisect
 import typing
+import operator
 import functools
+import contextlib
 import collections
 import dataclasses
+import concurrent.futures
 
 from pycldf.sources import Source
 from clldutils.misc import slug
 from clldutils import jsonlib
 from pyigt import IGT, LGRConformance
 
-from .config import TRANSCRIPTION, proto_pattern, witness_pattern, PROTO
+from .config import REFLEX_INVENTORY, match_proto, match_witness, PROTO
 from pytlopo.parser.forms import (
-    parse_protoform, POC_GRAPHEMES, iter_graphemes, iter_glosses, GlossDict, get_quotes,
+    parse_protoform, graphemes, iter_glosses, GlossDict, get_quotes,
     strip_footnote_reference, strip_comment, pos_pattern
 )
-from pytlopo.parser.lines import extract_etyma, iter_chapters, extract_igts, extract_formgroups
+from pytlopo.parser.lines import (
+    iter_chapters, extract_all_blocks, iter_lines, BLOCK_KINDS, LineTags,
+    LineIndex, index_chapters, replace_blocks,
+)
 from pytlopo.parser import refs
+from pytlopo.util import Trie
+from pytlopo.cache import Cache, fingerprint, digest
+from pytlopo.metrics import Metrics
+from pytlopo.trace import Tracer
+
+PROTO_TRIE = Trie(PROTO)
+MATCH_REF_CACHE_SIZE = 4096
+# A memoized form line costs a lookup and a clone, i.e. about a quarter of parsing it, so the memo
+# pays off once more than about a quarter of the lines recur. In the text of the volumes, reflexes
+# recur across etyma and form groups - the vol1 excerpt in the tests gets 9 hits for 3 misses.
+FORM_CACHE_SIZE = 4096
+# Slotted dataclasses are only supported from Python 3.10 on.
+SLOTS = dict(slots=True) if sys.version_info >= (3, 10) else {}
+
+
+def copy_source(src: Source) -> Source:
+    return Source(src.genre, src.id, list(src.items()), _check_id=False)
+
+
+def source_state(src: Source) -> tuple:
+    """
+    pycldf's `Source` cannot be pickled, so we pickle this state instead.
+    """
+    return src.genre, src.id, list(src.items())
+
+
+def chapter_page_ranges(metadata) -> typing.Dict[str, typing.Tuple[int, int]]:
+    """
+    :param metadata: `dict` mapping volume numbers to the volume metadata read from `md.json`.
+    :return: `dict` mapping chapter IDs `<volume>-<chapter>` to (first page, last page) pairs.
+    """
+    res = {}
+    for num, md in metadata.items():
+        for chap in md['chapters']:
+            s, _, e = chap['pages'].partition('-')
+            res['{}-{}'.format(num, chap['number'])] = (int(s), int(e))
+    return res
 
 
 @dataclasses.dataclass
@@ -49,6 +96,8 @@ class DataReference:
     section: tuple = None
     subsection: tuple = None
     page: int = 0
+    # The (start, end) line indices of the block in the volume text, see `iter_blocks`:
+    span: tuple = dataclasses.field(default=None, init=False, repr=False, compare=False)
 
     __table__ = None
 
@@ -83,6 +132,19 @@ class DataReference:
         return '[{}]({}#cldf:{})\n'.format(
             self.cldf_markdown_link_label(), self.__table__, self.id)
 
+    def iter_forms(self) -> typing.Iterator['Form']:
+        return iter(())
+
+    def shift_span(self, offset):
+        """
+        Shift the line spans of the object and its forms by `offset` lines.
+        """
+        if self.span:
+            self.span = (self.span[0] + offset, self.span[1] + offset)
+        for form in self.iter_forms():
+            if form.line is not None:
+                form.line += offset
+
 
 @dataclasses.dataclass(eq=False)
 class FormGroup(DataReference):
@@ -93,15 +155,23 @@ class FormGroup(DataReference):
         f = self.forms[0]
         return (slug(f.group), slug(f.lang), slug(f.forms[0]))
 
+    def iter_forms(self):
+        return iter(self.forms)
+
     @classmethod
-    def from_data(cls, vol, h1, h2, h3, page, lines):
+    def from_data(cls, vol, h1, h2, h3, page, lines, span=None):
         #if proto_pattern.match(line):
         #    protoforms.append(line)
         #elif witness_pattern.match(line):
         #    reflexes.append((line, False, False))
-        forms = [Reflex.from_line(vol, line) for line in lines if witness_pattern.match(line)]
+        forms = []
+        for i, line in enumerate(lines, start=1):
+            if match_witness(line):
+                forms.append(vol.parse_form(Reflex, line))
+                if span:
+                    forms[-1].line = span[0] + i
         assert forms, (vol.num, lines)
-        return cls(
+        res = cls(
             volume=str(vol.num),
             chapter=h1,
             section=h2,
@@ -109,6 +179,8 @@ class FormGroup(DataReference):
             page=page,
             forms=forms,
         )
+        res.span = span
+        return res
 
 
 @dataclasses.dataclass
@@ -270,7 +342,7 @@ MANNER       PATH        DEIXIS
         return [self.index]
 
     @classmethod
-    def from_data(cls, index, vol, h1, h2, h3, page, lines):
+    def from_data(cls, index, vol, h1, h2, h3, page, lines, span=None):
         num, ref, context = None, None, None
         header, examples = lines[0], lines[1:]
         header = header.strip()
@@ -318,15 +390,22 @@ MANNER       PATH        DEIXIS
             section=h2,
             subsection=h3,
             page=page,
-            index=index,
             number=num,
             context=context,
             examples=examples,
         )
-        for i, e in enumerate(res.examples, start=1):
-            e.id = '{}-{}'.format(res.id, i)
+        res.span = span
+        res.set_index(index)
         return res
 
+    def set_index(self, index):
+        """
+        Set the index of the group within the volume, updating the IDs of the examples accordingly.
+        """
+        self.index = index
+        for i, e in enumerate(self.examples, start=1):
+            e.id = '{}-{}'.format(self.id, i)
+
 
 def comment_or_sources(vol, cmt) \
         -> typing.Tuple[typing.Union[None, str], typing.Union[None, typing.List[Reference]]]:
@@ -344,8 +423,54 @@ def comment_or_sources(vol, cmt) \
     return None, srcs
 
 
-@dataclasses.dataclass(eq=False)
-class Gloss:
+class Compact:
+    """
+    Mixin for the small objects of which a corpus contains hundreds of thousands. Repeated
+    strings - like language names - in the attributes listed in `_interned` are interned, and
+    the pickled state is a plain tuple of field values.
+    """
+    __slots__ = ()
+    _interned = ()
+
+    def __post_init__(self):
+        for name in self._interned:
+            value = getattr(self, name)
+            if isinstance(value, str):
+                object.__setattr__(self, name, sys.intern(value))
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in field_names(type(self)))
+
+    def __setstate__(self, state):
+        for name, value in zip(field_names(type(self)), state):
+            object.__setattr__(self, name, value)
+        self.__post_init__()
+
+
+@functools.lru_cache(maxsize=None)
+def field_names(cls) -> typing.Tuple[str]:
+    return tuple(f.name for f in dataclasses.fields(cls))
+
+
+@functools.lru_cache(maxsize=None)
+def init_values(cls) -> operator.attrgetter:
+    return operator.attrgetter(*[f.name for f in dataclasses.fields(cls) if f.init])
+
+
+def clone(obj):
+    """
+    Copy a dataclass instance - like a `Form` - such that the copy shares no lists, nor the
+    dataclass instances in them, with the original. Fields which are not arguments of `__init__` -
+    like `Form.line` - are reset to their defaults.
+    """
+    return type(obj)(*[
+        [clone(v) if dataclasses.is_dataclass(v) else v for v in value]
+        if isinstance(value, list) else value
+        for value in init_values(type(obj))(obj)])
+
+
+@dataclasses.dataclass(eq=False, **SLOTS)
+class Gloss(Compact):
     gloss: str
     morpheme_gloss: str = None
     comment: str = None
@@ -356,6 +481,7 @@ class Gloss:
     qualifier: str = None  # Typically a gloss number.
     species: str = None
     doubt: bool = None
+    _interned = ('pos',)
 
     def key(self):
         return (self.gloss, self.pos, self.comment)
@@ -400,17 +526,24 @@ class Gloss:
         )
 
 
-@dataclasses.dataclass
-class Form:
+@dataclasses.dataclass(**SLOTS)
+class Form(Compact):
     lang: str
     forms: typing.List[str]
     glosses: typing.List[Gloss] = None
     subgroup: str = None
     footnote_number: str = None
     morpheme_gloss: str = None
+    # The index of the line in the volume text:
+    line: int = dataclasses.field(default=None, init=False, repr=False, compare=False)
+    _interned = ('lang', 'subgroup')
 
+    @property
+    def span(self) -> typing.Optional[typing.Tuple[int, int]]:
+        return None if self.line is None else (self.line, self.line + 1)
 
-@dataclasses.dataclass
+
+@dataclasses.dataclass(**SLOTS)
 class Protoform(Form):
     """
     PEOc (POC?)[6] *kori(s), *koris-i- 'scrape (esp. coconuts), grate (esp. coconuts)
@@ -438,7 +571,7 @@ class Protoform(Form):
         # FIXME: could store the quoting type with vol!?
         quotes = get_quotes(line)
         kw = {'glosses': []}
-        m = proto_pattern.match(line)
+        m = match_proto(line)
         assert m
 
         kw['lang'] = m.group('pl')
@@ -508,11 +641,12 @@ class Protoform(Form):
         return cls(subgroup=subgroup, footnote_number=fn, **kw)
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(**SLOTS)
 class Reflex(Form):
     group: str = None
     lfn: str = None  # Footnote with comment about the language.
     ffn: str = None  # Footnote with comment about the form.
+    _interned = ('lang', 'subgroup', 'group')
 
     @property
     def form(self):
@@ -565,9 +699,9 @@ class Reflex(Form):
             rem = ' '.join(rem_comps)
 
         for w in words:
-            for c in iter_graphemes(w):
+            for c in graphemes(w):
                 if c != ',':
-                    if c not in POC_GRAPHEMES + TRANSCRIPTION:
+                    if c not in REFLEX_INVENTORY:
                         raise ValueError(c, w, rem, line)  # pragma: no cover
 
         rem, ffn, pos = strip_footnote_reference(rem, start_only=True)
@@ -607,6 +741,11 @@ class Reconstruction(DataReference):
     cfs: list = None
     disambiguation: str = 'a'
 
+    def iter_forms(self):
+        yield from self.reflexes
+        for _, forms in self.cfs or []:
+            yield from forms
+
     @functools.cached_property
     def oceanic_protoforms(self):
         return [
@@ -660,35 +799,49 @@ class Reconstruction(DataReference):
             self.id)
 
     @classmethod
-    def from_data(cls, vol, h1, h2, h3, pageno, forms):
+    def from_data(cls, vol, h1, h2, h3, pageno, forms, span=None):
+        """
+        :param span: The line span of the block - see `iter_blocks` - from which the line indices \
+        of the forms are computed, knowing that `formblock` splits the block lines in order.
+        """
         forms, cfs = forms
 
-        def iter_objs(lines):
+        def iter_objs(lines, start):
             subgroup = None
-            for line in lines:
-                if proto_pattern.match(line):
-                    yield Protoform.from_line(vol, line, subgroup=subgroup)
-                    continue
-                if witness_pattern.match(line):
-                    yield Reflex.from_line(vol, line, subgroup=subgroup)
-                    continue
-                if line.startswith('-'):
+            for i, line in enumerate(lines, start=start):
+                if match_proto(line):
+                    obj = vol.parse_form(Protoform, line, subgroup=subgroup)
+                elif match_witness(line):
+                    obj = vol.parse_form(Reflex, line, subgroup=subgroup)
+                elif line.startswith('-'):
                     subgroup = line[1:].strip()
                     continue
-                raise ValueError(line)  # pragma: no cover
+                else:
+                    raise ValueError(line)  # pragma: no cover
+                if span:
+                    obj.line = i
+                yield obj
 
-        reflexes = list(iter_objs(forms))
+        start = span[0] + 1 if span else 0
+        reflexes = list(iter_objs(forms, start))
         assert any(isinstance(ref, Protoform) for ref in reflexes)
+        start += len(forms)
+        cf_objs = []
+        for cfspec, cf in cfs or []:
+            cf_objs.append((cfspec, list(iter_objs(cf, start + 1))))  # Skip the "cf. also" line.
+            start += len(cf) + 1
 
-        return cls(
+        res = cls(
             volume=vol.num,
             chapter=h1,
             section=h2,
             subsection=h3,
             page=pageno,
             reflexes=reflexes,
-            cfs=[(cfspec, list(iter_objs(cf)))  for cfspec, cf in cfs or []]
+            cfs=cf_objs,
         )
+        res.span = span
+        return res
 
     def __str__(self):
         res = """\
@@ -741,8 +894,21 @@ class Chapter:
         bib['author'] = md['author']
         bib['pages'] = md['pages']
         header = "\n[{}]{{.smallcaps}}\n\n<!--start-->\n".format(md['author'])
-        text = vol.replace_cross_refs(text, num)
-        return cls(polish_text(header + vol.replace_refs(text)), toc, bib, pages=pages)
+        nlines = text.count('\n') + 1
+        with vol.timer('replace_cross_refs', lines=nlines):
+            text = vol.replace_cross_refs(text, num)
+        with vol.timer('replace_refs', lines=nlines):
+            text = vol.replace_refs(text)
+        return cls(polish_text(header + text), toc, bib, pages=pages)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['bib'] = source_state(self.bib)
+        return state
+
+    def __setstate__(self, state):
+        state['bib'] = Source(*state['bib'], _check_id=False)
+        self.__dict__.update(state)
 
     def iter_sections(self):
         anchor = re.compile(r'<a id=\"(?P<sec>s-[0-9\-]+)\">')
@@ -760,45 +926,197 @@ class Chapter:
             yield sec, '\n'.join(lines)
 
 
+_worker_volume = None
+
+
+def _init_block_worker(vol):
+    global _worker_volume
+    _worker_volume = vol
+    if vol.tracer is not None:
+        # With the "fork" start method, the worker inherits the events recorded by the parent.
+        vol.tracer.pop()
+
+
+def _parse_block(kind, index, block):
+    """
+    :return: Pair (parsed object, list of trace events recorded in the worker).
+    """
+    obj = _worker_volume.parse_block(kind, index, *block)
+    return obj, _worker_volume.tracer.pop() if _worker_volume.tracer is not None else []
+
+
 class Volume:
-    def __init__(self, d, langs, bib, sources):
+    # The cached properties holding the results of parsing a volume.
+    results_properties = ('reconstructions', 'formgroups', 'igts', 'chapters')
+
+    def __init__(self,
+                 d,
+                 langs,
+                 bib,
+                 sources,
+                 metadata=None,
+                 chapter_pages=None,
+                 workers=1,
+                 cache_dir=None,
+                 metrics=False,
+                 trace=False,
+                 form_cache_size=FORM_CACHE_SIZE):
+        """
+        :param metadata: The volume metadata, if already read from `md.json`.
+        :param chapter_pages: Page ranges of the chapters of all volumes, as computed by \
+        `chapter_page_ranges`.
+        :param workers: Number of worker processes used to parse the blocks of the text; `None` \
+        means one per CPU, `1` means parsing in the current process.
+        :param cache_dir: Directory for a persistent cache of the parse results, see \
+        `pytlopo.cache`.
+        :param metrics: If `True`, per-stage metrics of the pipeline are recorded in `metrics`, \
+        see `pytlopo.metrics`.
+        :param trace: If `True`, spans of the pipeline are recorded with `tracer`, see \
+        `pytlopo.trace`.
+        :param form_cache_size: Maximal number of parsed protoform and reflex lines memoized by \
+        `parse_form`; `0` disables memoizing, `None` means no limit.
+        """
         self.dir = d
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.form_cache_size = form_cache_size
+        self.metrics = Metrics() if metrics else None
+        self.tracer = Tracer() if trace else None
         self.num = d.name[-1]
         self.langs = langs
-        self.metadata = jsonlib.load(self.dir / 'md.json')
-        self._lines = None
+        self.metadata = metadata or jsonlib.load(self.dir / 'md.json')
+        # The links replacing the blocks in the text and the `LineTags` of the text, once parsed:
+        self._links, self._tags = None, None
+        self._bib = copy_source(bib)
         bib.id = 'tlopo{}'.format(self.num)
         bib['title'] += ' {}: {}'.format(self.num, self.metadata['title'])
         self.bib = bib
         self.sources = sources
-        self.chapter_pages = {}
-
-        for md in self.dir.parent.glob('vol*/md.json'):
-            for chap in jsonlib.load(md)['chapters']:
-                s, _, e = chap['pages'].partition('-')
-                self.chapter_pages[
-                    '{}-{}'.format(md.parent.name.replace('vol', ''), chap['number'])] = \
-                        (int(s), int(e))
+        self._match_ref = functools.lru_cache(maxsize=MATCH_REF_CACHE_SIZE)(
+            self._match_ref_uncached)
+        self._parse_form = functools.lru_cache(maxsize=form_cache_size)(
+            self._parse_form_uncached)
+        if chapter_pages is None:
+            chapter_pages = chapter_page_ranges({
+                md.parent.name.replace('vol', ''): jsonlib.load(md)
+                for md in self.dir.parent.glob('vol*/md.json')})
+        self.chapter_pages = chapter_pages
+
+    def __getstate__(self):
+        """
+        Volumes are pickled - e.g. to be sent to worker processes - as their input data, i.e.
+        without any parse results.
+        """
+        return dict(
+            d=self.dir,
+            langs=self.langs,
+            bib=source_state(self._bib),
+            sources=self.sources,
+            metadata=self.metadata,
+            chapter_pages=self.chapter_pages,
+            workers=self.workers,
+            cache_dir=self.cache_dir,
+            metrics=self.metrics is not None,
+            trace=self.tracer is not None,
+            form_cache_size=self.form_cache_size)
+
+    def __setstate__(self, state):
+        state['bib'] = Source(*state['bib'], _check_id=False)
+        self.__init__(**state)
 
     def __str__(self):  # pragma: no cover
         return self.bib['title']
 
+    def results(self) -> dict:
+        """
+        Parse the volume (if not done yet) and return the results keyed by property name.
+        """
+        with self.span('volume {}'.format(self.num)):
+            res = {name: getattr(self, name) for name in self.results_properties}
+        if self.metrics is not None:
+            res['metrics'] = self.metrics
+        if self.tracer is not None:
+            res['trace'] = self.tracer.events
+        return res
+
+    def load_results(self, results: dict):
+        """
+        Set the results of parsing the volume, e.g. as computed in another process.
+        """
+        for name in self.results_properties:
+            self.__dict__[name] = results[name]  # Fill the cache of the `cached_property`.
+        metrics = results.get('metrics')
+        if self.metrics is not None and metrics is not None and metrics is not self.metrics:
+            self.metrics.update(metrics)
+        trace = results.get('trace')
+        if self.tracer is not None and trace is not None and trace is not self.tracer.events:
+            self.tracer.extend(trace)
+
+    def timer(self, stage, lines=0, objects=0):
+        """
+        Context manager timing a stage of the pipeline - if metrics are recorded.
+        """
+        if self.metrics is None:
+            return contextlib.nullcontext()
+        return self.metrics.timer(stage, lines=lines, objects=objects)
+
+    def span(self, name, cat='pytlopo', **args):
+        """
+        Context manager recording a span of the pipeline - if tracing is enabled.
+        """
+        if self.tracer is None:
+            return contextlib.nullcontext()
+        return self.tracer.span(name, cat=cat, **args)
+
+    @functools.cached_property
+    def language_trie(self):
+        return Trie(self.langs)
+
     def match_language(self, s, group=None):
-        for lg in sorted(self.langs, key=lambda l: -len(l)):
-            if s.startswith(lg):
-                assert group is None or (self.langs[lg]['Group'] == group), (group, lg, s)
-                return lg, self.langs[lg], s[len(lg):]
-        for k in PROTO:
-            if s.startswith(k):
-                return k, None, s[len(k):]
+        """
+        Match the longest language name - or, if no language matches, the longest proto-language
+        name - at the start of `s`.
+        """
+        m = self.language_trie.longest_prefix(s)
+        if m:
+            lg, ldata = m
+            assert group is None or (ldata['Group'] == group), (group, lg, s)
+            return lg, ldata, s[len(lg):]
+        m = PROTO_TRIE.longest_prefix(s)
+        if m:
+            return m[0], None, s[len(m[0]):]
 
     @functools.cached_property
     def chapters(self):
-        if not self._lines:
-            assert self.reconstructions
-        return collections.OrderedDict(
-            (num, Chapter.from_text(self, num, text, toc))
-            for num, text, toc in iter_chapters(self._lines, self.dir))
+        if self._links is None:  # Links may already be available from `iter_objects`.
+            assert self._blocks
+            if 'chapters' in self.__dict__:  # Loaded from the cache.
+                return self.__dict__['chapters']
+        return self._render_chapters()
+
+    def _render_chapters(self, cache=None):
+        res, keys = collections.OrderedDict(), []
+        base = fingerprint(self, text=False) if cache else None
+        with LineIndex(self.dir.joinpath('text.txt')) as index:
+            # The text with blocks replaced by links is read lazily, chapter by chapter.
+            lines, tags = replace_blocks(index, self._tags, self._links)
+            chapters = iter_chapters(lines, self.dir, tags=tags)
+            if self.metrics is not None:
+                chapters = self.metrics.timed('iter_chapters', chapters, lines=len(tags))
+            for num, text, toc in chapters:
+                if cache:
+                    keys.append(digest(base, num, text, toc))
+                    res[num] = cache.load(self, 'chapter', keys[-1])
+                    if res[num] is None:
+                        with self.span('render chapter {}'.format(num), cat='chapter'):
+                            res[num] = Chapter.from_text(self, num, text, toc)
+                        cache.dump(self, 'chapter', keys[-1], res[num])
+                else:
+                    with self.span('render chapter {}'.format(num), cat='chapter'):
+                        res[num] = Chapter.from_text(self, num, text, toc)
+        if cache:
+            cache.prune(self, 'chapter', keys)
+        return res
 
     @functools.cached_property
     def source_in_brackets_pattern_dict(self):
@@ -811,17 +1129,54 @@ class Volume:
             res[src.id] = refs.key_to_regex(src['key'])
         return res
 
+    @functools.cached_property
+    def source_in_brackets_index(self):
+        """
+        Maps index keys (see `refs.index_key`) to lists of (position, source ID, pattern) triples.
+        """
+        keys = {src.id: src['key'] for src in self.sources}
+        res = collections.defaultdict(list)
+        for i, (srcid, pattern) in enumerate(self.source_in_brackets_pattern_dict.items()):
+            res[refs.index_key(keys[srcid])].append((i, srcid, pattern))
+        return res
+
     def match_ref(self, s):
+        return self._match_ref(s)
+
+    def parse_form(self, cls, line, subgroup=None) -> typing.Union[Protoform, Reflex]:
+        """
+        Parse a protoform or reflex line. Unless `form_cache_size` is `0`, the results are memoized,
+        keyed by line and subgroup. The hit and miss statistics are available via `form_cache_info`.
+
+        :param cls: `Protoform` or `Reflex`.
+        :return: A new object - i.e. a clone of the memoized one - which can thus be modified.
+        """
+        res = self._parse_form(cls, line, subgroup)
+        return clone(res) if self.form_cache_size != 0 else res
+
+    def _parse_form_uncached(self, cls, line, subgroup):
+        return cls.from_line(self, line, subgroup=subgroup)
+
+    def form_cache_info(self):
+        return self._parse_form.cache_info()
+
+    def _match_ref_uncached(self, s):
         if not s.startswith('('):
             s = '({})'.format(s)
         pages = None
         if s.endswith(')'):
-            pages_pattern = re.compile(r'\:\s*(?P<pages>[0-9]+([,;-]\s*[0-9]+)*)\)')
-            m = pages_pattern.search(s)
+            m = refs.PAGES_PATTERN.search(s)
             if m:
                 pages = m.group('pages')
                 s = s[:m.start()] + ')'
-        for srcid, pattern in self.source_in_brackets_pattern_dict.items():
+        # Only sources which have been indexed under a matching key - or which could not be indexed
+        # at all - are candidates. We try them in the order of the bibliography, though.
+        index = self.source_in_brackets_index
+        candidates = list(index.get(None, []))
+        for key in refs.citation_index_keys(s):
+            if key in index:
+                candidates.extend(index[key])
+        for _, srcid, pattern in sorted(candidates, key=lambda c: c[0]):
             m = pattern.fullmatch(s)
             if m:
                 return srcid, pages or m.groupdict().get('pages')
@@ -890,9 +1245,39 @@ class Volume:
         res = refs.FIGURE_REF_PATTERN.sub(figref, res)
         return res
 
+    @functools.cached_property
+    def source_mention_index(self):
+        """
+        Index of the literal author names in-text citations start with.
+
+        :return: triple (trie mapping names to sets of source IDs, regex matching any of the \
+        names at a position, set of IDs of sources which cannot be indexed).
+        """
+        keys = {src.id: src['key'] for src in self.sources}
+        names, unindexed = collections.defaultdict(set), set()
+        for srcid in self.source_pattern_dict:
+            name = refs.mention_key(keys[srcid])
+            if name is None:
+                unindexed.add(srcid)
+            else:
+                names[name].add(srcid)
+        trie = Trie(names)
+        return trie, re.compile('(?=({}))'.format(trie.regex())) if names else None, unindexed
+
     def replace_refs(self, s):
+        # Scan the text once for author names to determine the candidate sources ...
+        trie, pattern, candidates = self.source_mention_index
+        candidates = set(candidates)
+        if pattern:
+            for m in pattern.finditer(s):
+                # At each position, `pattern` matches the longest name, thus we also add the sources
+                # for names which are prefixes of this one.
+                for _, srcids in trie.prefixes(m.group(1)):
+                    candidates |= srcids
+        # ... and only run the substitutions for these - still with the longest keys first.
         for srcid, pattern in self.source_pattern_dict.items():
-            s = pattern.sub(functools.partial(refs.repl_ref, srcid), s)
+            if srcid in candidates:
+                s = pattern.sub(functools.partial(refs.repl_ref, srcid), s)
 
         sep = r',\s*|\s+and\s+'  # We look for comma or " and " separated years.
         m = re.compile(r"\(Source#cldf:([^\)]+)\)(({})[0-9]+(\-[0-9]+)?[a-z]?)+".format(sep))
@@ -920,69 +1305,310 @@ class Volume:
 
     @functools.cached_property
     def reconstructions(self):
-        return list(self._iter_reconstructions(
-            self.dir.joinpath('text.txt').read_text(encoding='utf8').split('\n')))
+        return self._blocks['etymon']
+
+    @functools.cached_property
+    def _span_index(self) -> typing.Tuple[typing.List[int], typing.List[DataReference]]:
+        objs = sorted(
+            (obj for name in ['reconstructions', 'formgroups', 'igts']
+             for obj in getattr(self, name) if obj.span),
+            key=lambda obj: obj.span)
+        return [obj.span[0] for obj in objs], objs
+
+    def objects_at(self, lineno) -> list:
+        """
+        :param lineno: Index of a line in the volume text.
+        :return: The objects parsed from the line, i.e. the block object - reconstruction, form \
+        group or example group - and forms (if any) parsed from the line.
+        """
+        starts, objs = self._span_index
+        i = bisect.bisect_right(starts, lineno) - 1
+        if i < 0 or lineno >= objs[i].span[1]:
+            return []
+        return [objs[i]] + [form for form in objs[i].iter_forms() if form.line == lineno]
 
     @functools.cached_property
     def formgroups(self):
-        return list(self._iter_formgroups())
+        return self._blocks['formgroup']
 
     @functools.cached_property
     def igts(self):
-        return list(self._iter_igts())
-
-    def _iter_reconstructions(self, lines):
-        rids = set()
-        etyma = extract_etyma(lines)
-        h1, h2, h3, pageno, paras = next(etyma)
-        rec = Reconstruction.from_data(self, h1, h2, h3, pageno, paras)
-        rids.add(rec.id)
-        yield rec
-        try:
-            while True:
-                h1, h2, h3, pageno, paras = etyma.send(rec.cldf_markdown_link())
-                rec = Reconstruction.from_data(self, h1, h2, h3, pageno, paras)
-                if rec.id in rids:
-                    rec.disambiguation = 'b'
-                rids.add(rec.id)
-                yield rec
-        except StopIteration as e:
-            self._lines = e.value
-
-    def _iter_formgroups(self):
-        assert self.reconstructions
-        forms = extract_formgroups(self._lines)
-        try:
-            h1, h2, h3, pageno, block = next(forms)
-        except StopIteration:  # pragma: no cover
-            return
-        fg = FormGroup.from_data(self, h1, h2, h3, pageno, block)
-        yield fg
+        return self._blocks['igt']
+
+    def iter_objects(self, keep_lines=False) -> typing.Generator[
+            typing.Union['Reconstruction', FormGroup, ExampleGroup], None, None]:
+        """
+        Read and parse the volume text incrementally, yielding reconstructions, form groups and
+        example groups in order of appearance - without keeping them in memory.
+
+        :param keep_lines: If `True`, the links replacing the blocks and the tags of the lines are \
+        kept once the text has been read completely, so that `chapters` can be rendered without \
+        parsing the text again.
+        """
+        rids, page, n, links, tags = set(), None, 0, [], None
+        lines = iter_lines(self.dir.joinpath('text.txt'))
+        if self.metrics is not None:
+            lines = self.metrics.counted('extract_blocks', lines)
+        if keep_lines:
+            tags = LineTags()
+            lines = tags.tagged(lines)
+        blocks = extract_all_blocks(lines, keep_lines=False, tags=tags)
+        if self.metrics is not None:
+            blocks = self.metrics.timed('extract_blocks', blocks)
         try:
+            kind, *block = next(blocks)
             while True:
-                h1, h2, h3, pageno, block = forms.send(fg.cldf_markdown_link())
-                fg = FormGroup.from_data(self, h1, h2, h3, pageno, block)
-                yield fg
-        except StopIteration as e:
-            self._lines = e.value
-
-    def _iter_igts(self):
-        n = 0
-        assert self.reconstructions
-        igts = extract_igts(self._lines)
-        try:
-            h1, h2, h3, pageno, block = next(igts)
-            n += 1
-        except StopIteration:  # pragma: no cover
-            return
-        eg = ExampleGroup.from_data(n, self, h1, h2, h3, pageno, block)
-        yield eg
-        try:
-            while True:
-                h1, h2, h3, pageno, block = igts.send(eg.cldf_markdown_link())
-                n += 1
-                eg = ExampleGroup.from_data(n, self, h1, h2, h3, pageno, block)
-                yield eg
-        except StopIteration as e:
-            self._lines = e.value
+                obj = self.parse_block(kind, n + 1, *block)
+                if kind == 'etymon':
+                    # IDs can only collide for reconstructions on the same page, so we only need
+                    # to remember the IDs of the current page.
+                    if (obj.chapter, obj.page) != page:
+                        rids, page = set(), (obj.chapter, obj.page)
+                    if obj.id in rids:
+                        obj.disambiguation = 'b'
+                    rids.add(obj.id)
+                elif kind == 'igt':
+                    n += 1
+                yield obj
+                if keep_lines:
+                    links.append((*block[-1], obj.cldf_markdown_link()))
+                kind, *block = blocks.send(None)
+        except StopIteration:
+            if keep_lines:
+                self._links, self._tags = links, tags
 
+    @functools.cached_property
+    def _chapter_index(self):
+        """
+        :return: Pair (`LineTags` of the text, list of chunks as computed by `index_chapters`).
+        """
+        with LineIndex(self.dir.joinpath('text.txt')) as lines:
+            tags = self._tag_lines(lines)
+            return tags, index_chapters(lines, tags=tags)
+
+    def parse(self, chapters=None, pages=None) -> typing.Dict[str, list]:
+        """
+        Parse only the objects in selected chapters or on selected pages, with the same results as
+        the parse of the whole volume. Using an index of chapter boundaries, only the chunks of
+        the text containing the selection are read.
+
+        :param chapters: List of chapter numbers.
+        :param pages: Pair (first page, last page).
+        :return: `dict` mapping the names "reconstructions", "formgroups" and "igts" to lists of \
+        parsed objects.
+        """
+        def selected(chunk_chapter, first_page, last_page):
+            if chapters is not None and chunk_chapter not in {str(c) for c in chapters}:
+                return False
+            return pages is None or (first_page <= pages[1] and last_page >= pages[0])
+
+        tags, index = self._chapter_index
+        res = {kind: [] for kind in BLOCK_KINDS}
+        with LineIndex(self.dir.joinpath('text.txt')) as lines:
+            for start, end, first_page, last_page, counts in index:
+                c = tags.fields.get(start)  # The chapter heading - if the chunk isn't a preamble.
+                chapter = c[0][0] if c and c[0] and len(c[0]) == 1 else None
+                if not selected(chapter, first_page, last_page):
+                    continue
+                rids, local = set(), collections.Counter()
+                for kind, *block in extract_all_blocks(
+                        lines[start:end],
+                        pageno=first_page,
+                        keep_lines=False,
+                        tags=tags[start:end],
+                        lineno=start):
+                    local.update([kind])
+                    if pages and not (pages[0] <= block[3] <= pages[1]):
+                        continue
+                    obj = self.parse_block(kind, local[kind], *block)
+                    # Resolve the state depending on other blocks of the volume, see `_assemble`.
+                    if kind == 'etymon':
+                        if obj.id in rids:
+                            obj.disambiguation = 'b'
+                        rids.add(obj.id)
+                    elif kind == 'igt':
+                        obj.set_index(counts[kind] + local[kind])
+                    res[kind].append(obj)
+        return dict(reconstructions=res['etymon'], formgroups=res['formgroup'], igts=res['igt'])
+
+    def iter_reconstructions(self, keep_lines=False):
+        for obj in self.iter_objects(keep_lines=keep_lines):
+            if isinstance(obj, Reconstruction):
+                yield obj
+
+    def parse_block(self, kind, index, h1, h2, h3, pageno, block, span=None):
+        """
+        :param index: 1-based index of the block among the blocks of the same kind.
+        :param span: The line span of the block, see `iter_blocks`.
+        """
+        if self.metrics is not None:
+            start = time.perf_counter()
+        with self.span(kind, cat='block', chapter=h1[0] if h1 else None, page=pageno):
+            if kind == 'etymon':
+                res = Reconstruction.from_data(self, h1, h2, h3, pageno, block, span=span)
+                nlines = len(block[0]) + sum(len(cf) + 1 for _, cf in block[1])
+            elif kind == 'formgroup':
+                res = FormGroup.from_data(self, h1, h2, h3, pageno, block, span=span)
+                nlines = len(block)
+            else:
+                assert kind == 'igt', kind
+                res = ExampleGroup.from_data(index, self, h1, h2, h3, pageno, block, span=span)
+                nlines = len(block)
+        if self.metrics is not None:
+            self.metrics.add(
+                '{}.from_data'.format(type(res).__name__),
+                time.perf_counter() - start,
+                lines=nlines,
+                objects=1)
+        return res
+
+    @functools.cached_property
+    def _blocks(self) -> typing.Dict[str, list]:
+        """
+        :return: `dict` mapping block kinds to lists of parsed objects.
+        """
+        if self.cache_dir is None:
+            with self.span('parse volume {}'.format(self.num), cat='volume'), \
+                    LineIndex(self.dir.joinpath('text.txt')) as lines:
+                objs, self._tags = self._parse_lines(lines)
+                return self._assemble(objs)
+
+        # With a cache, we always load - or compute and store - all results.
+        cache, key = Cache(self.cache_dir), fingerprint(self)
+        results = cache.load(self, 'volume', key)
+        if results is None:
+            with LineIndex(self.dir.joinpath('text.txt')) as lines:
+                self._tags = self._tag_lines(lines)
+                blocks = self._parse_chapters_incrementally(lines, cache, self._tags)
+            results = dict(
+                reconstructions=blocks['etymon'],
+                formgroups=blocks['formgroup'],
+                igts=blocks['igt'],
+                chapters=self._render_chapters(cache))
+            cache.dump(self, 'volume', key, results)
+            cache.prune(self, 'volume', [key])
+        self.load_results(results)
+        return dict(
+            etymon=results['reconstructions'],
+            formgroup=results['formgroups'],
+            igt=results['igts'])
+
+    def _parse_chapters_incrementally(self, lines, cache, tags):
+        """
+        Parse the text chapter by chapter, re-using cached results for unchanged chapters.
+
+        The blocks of all chapters missing from the cache are parsed in one go - i.e. using one
+        process pool if `workers` is not `1`.
+        """
+        base, keys = fingerprint(self, text=False), []
+        segments = []
+        for start, end, pageno, _, _ in index_chapters(lines, tags=tags):
+            # Only the lines of one chapter are read - and held in memory - at a time.
+            chunk = lines[start:end]
+            # The parse results only depend on the lines of the chapter and the page number.
+            keys.append(digest(base, pageno, chunk))
+            res, cached = cache.load(self, 'segment', keys[-1]), True
+            if res is None:
+                with self.span('extract chapter', cat='chapter', page=pageno):
+                    res, _ = self._extract_blocks(chunk, pageno=pageno, tags=tags[start:end])
+                cached = False
+            segments.append((start, keys[-1], res, cached))
+
+        parsed = iter(self._parse_blocks(
+            [block for _, _, res, cached in segments if not cached for block in res]))
+        objs = []
+        for start, key, res, cached in segments:
+            if not cached:
+                res = [next(parsed) for _ in res]
+                cache.dump(self, 'segment', key, res)
+            # Chunks are parsed - and cached - with line spans relative to the chunk.
+            for _, obj in res:
+                obj.shift_span(start)
+            objs.extend(res)
+        cache.prune(self, 'segment', keys)
+        return self._assemble(objs)
+
+    def _tag_lines(self, lines) -> LineTags:
+        with self.timer('tag_lines', lines=len(lines)), self.span('tag_lines', lines=len(lines)):
+            return LineTags(lines)
+
+    def _parse_lines(self, lines, pageno=-1, tags=None):
+        """
+        Extract and parse etyma, form groups and IGTs in one pass over `lines` - in a process pool
+        if `workers` is not `1`.
+
+        :param tags: `LineTags` of `lines` - if not given, the lines are tagged while the blocks \
+        are extracted, thus reading each line only once.
+        :return: Pair (list of (kind, parsed object) pairs, `LineTags` of `lines`).
+        """
+        collected, tags = self._extract_blocks(lines, pageno=pageno, tags=tags)
+        return self._parse_blocks(collected), tags
+
+    def _extract_blocks(self, lines, pageno=-1, tags=None):
+        """
+        :return: Pair (list of (kind, index, block) triples, `LineTags` of `lines`), see \
+        `_parse_lines`.
+        """
+        collected, counts, nlines = [], collections.Counter(), len(lines)
+        if tags is None:
+            tags = LineTags()
+            lines = tags.tagged(lines)
+        blocks = extract_all_blocks(lines, pageno=pageno, keep_lines=False, tags=tags)
+        if self.metrics is not None:
+            blocks = self.metrics.timed('extract_blocks', blocks, lines=nlines)
+        with self.span('extract_blocks', lines=nlines):
+            try:
+                kind, *block = next(blocks)
+                while True:
+                    counts.update([kind])
+                    collected.append((kind, counts[kind], block))
+                    kind, *block = blocks.send(None)
+            except StopIteration:
+                pass
+        return collected, tags
+
+    def _parse_blocks(self, collected):
+        """
+        Parse blocks as extracted by `_extract_blocks` - in a process pool if `workers` is not `1`.
+
+        :return: List of (kind, parsed object) pairs.
+        """
+        if self.workers == 1 or not collected:
+            objs = [self.parse_block(kind, index, *block) for kind, index, block in collected]
+        else:
+            # The metrics recorded in the workers are lost, so we time the pool as a whole.
+            pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_block_worker,
+                initargs=(self,))
+            with self.timer('parse_blocks', objects=len(collected)), \
+                    self.span('parse_blocks', objects=len(collected)), pool as executor:
+                objs = []
+                for obj, events in executor.map(
+                        _parse_block,
+                        *zip(*collected),
+                        chunksize=max(
+                            1, len(collected) // ((self.workers or os.cpu_count() or 1) * 4))):
+                    objs.append(obj)
+                    if self.tracer is not None:
+                        self.tracer.extend(events)
+        return [(kind, obj) for (kind, _, _), obj in zip(collected, objs)]
+
+    def _assemble(self, objs):
+        """
+        Resolve the state depending on all blocks of the volume - i.e. reconstruction ID
+        disambiguation and example group numbering - and store the links to the objects, which
+        replace the blocks when rendering the chapters, in `_links`.
+        """
+        res, rids = {kind: [] for kind in BLOCK_KINDS}, set()
+        for kind, obj in objs:
+            if kind == 'etymon':  # Disambiguate reconstruction IDs in order of appearance.
+                obj.disambiguation = 'a'
+                if obj.id in rids:
+                    obj.disambiguation = 'b'
+                rids.add(obj.id)
+            elif kind == 'igt':
+                obj.set_index(len(res[kind]) + 1)
+            res[kind].append(obj)
+        self._links = [obj.span + (obj.cldf_markdown_link(),) for _, obj in objs]
+        return res
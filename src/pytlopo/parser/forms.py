@@ -19,14 +19,18 @@ True
 """
 import re
 import typing
+import functools
 import unicodedata
 
 from clldutils.text import split_text_with_context
 
-from pytlopo.config import PROTO, POC_GRAPHEMES, POS, re_choice, fn_pattern, kinship_pattern
+from pytlopo.config import (
+    PROTO, POC_GRAPHEMES, POS, TRANSCRIPTION, PROTO_INVENTORIES, re_choice, fn_pattern,
+    kinship_pattern,
+)
 
 __all__ = [
-    'iter_graphemes', 'parse_protoform', 'strip_comment', 'strip_footnote_reference',
+    'iter_graphemes', 'graphemes', 'parse_protoform', 'strip_comment', 'strip_footnote_reference',
     'iter_glosses', 'strip_pos',
 ]
 
@@ -96,29 +100,69 @@ def strip_comment(s, position='end'):
     return None, s
 
 
+# Character classes relevant for grapheme segmentation:
+BASE, MODIFIER, COMBINING = 0, 1, 2
+
+
+def _classify(c) -> typing.Tuple[int, bool]:
+    """
+    Returns the segmentation class of a character and whether it is a lowercase letter.
+    """
+    cat = unicodedata.name(c).split()[0]
+    return (
+        MODIFIER if cat == 'MODIFIER' else (COMBINING if cat == 'COMBINING' else BASE),
+        unicodedata.category(c) == 'Ll')
+
+
+# Character class table, precomputed for the characters we know about and filled lazily with
+# whatever else turns up in the data.
+CHAR_CLASSES = {
+    c: _classify(c) for c in set(''.join(
+        [chr(i) for i in range(32, 127)] + POC_GRAPHEMES + TRANSCRIPTION +
+        [g for graphemes in PROTO.values() for g in graphemes]))}
+
+
+def char_class(c) -> typing.Tuple[int, bool]:
+    try:
+        return CHAR_CLASSES[c]
+    except KeyError:
+        res = CHAR_CLASSES[c] = _classify(c)
+        return res
+
+
 def iter_graphemes(s):
-    g, left = '', ''
+    g, left, lower = '', '', False  # `lower` records whether `g` contains a lowercase letter.
     for c in s:
-        cat = unicodedata.name(c).split()[0]
-        if cat not in {'MODIFIER', 'COMBINING'}:  # a letter.
+        cls, ll = char_class(c)
+        if cls == BASE:  # a letter.
             if g:
                 yield g
             if left:  # concatenate whatever modifiers are left.
                 g = left + c
+                lower = ll or any(char_class(cc)[1] for cc in left)
                 left = ''
             else:
-                g = c
+                g, lower = c, ll
         else:
-            if cat == 'MODIFIER' and g and g in 'iau':  # Modifiers apply from the left.
+            if cls == MODIFIER and g and g in 'iau':  # Modifiers apply from the left.
                 left += c
-            elif g and any(unicodedata.category(cc) == 'Ll' for cc in g):  # We have a letter.
+            elif g and lower:  # We have a letter.
                 g += c
+                lower = lower or ll
             else:
                 left += c
     if g:
         yield g
 
 
+@functools.lru_cache(maxsize=2 ** 16)
+def graphemes(s) -> typing.Tuple[str, ...]:
+    """
+    Memoized segmentation of `s` into graphemes.
+    """
+    return tuple(iter_graphemes(s))
+
+
 def parse_protoform(f, pl, allow_rem=True) -> typing.Tuple[typing.List[str], str]:
     """
     Assumes a string `f` immediately following a protoform marker `*`. Then consumes graphemes as
@@ -154,9 +198,7 @@ def parse_protoform(f, pl, allow_rem=True) -> typing.Tuple[typing.List[str], str
     #    print(f, pl, allow_rem)
 
     in_bracket, in_sbracket, in_abracket = False, False, False
-    phonemes = [g for g in POC_GRAPHEMES]
-    phonemes.append('-')
-    phonemes.extend(PROTO[pl])
+    phonemes = PROTO_INVENTORIES[pl]
     form, length = '', 0
     tilde = False
     for c in iter_graphemes(f):
@@ -2,45 +2,162 @@
 Parse line-level markup.
 """
 import re
+import mmap
+import array
+import bisect
+import string
+import typing
 import functools
+import collections
 
 from tabulate import tabulate
 
-from pytlopo.config import proto_pattern, witness_pattern, fn_pattern
+from pytlopo.config import match_proto, match_witness, fn_pattern
 
 CF_LINE_PREFIX = 'cf. also'
 
-h1_pattern = re.compile(r'(?P<a>[0-9]+)\.?\s+(?P<title>([\_‘♂])?[A-Z].+)')
-h2_pattern = re.compile(r'(?P<a>[0-9]+)(\.|\s)\s*(?P<b>[0-9]+)\.?\s+(?P<title>([\_‘♂])?[A-Z].+)')
-h3_pattern = re.compile(r'(?P<a>[0-9]+)(\.|\s)\s*(?P<b>[0-9]+)(\.|\s)\s*(?P<c>[0-9]+)\.?\s+(?P<title>([\_‘♂])?[mA-Z].+)')
-h4_pattern = re.compile(r'(?P<a>[0-9]+)(\.|\s)\s*(?P<b>[0-9]+)(\.|\s)\s*(?P<c>[0-9]+)(\.|\s)\s*(?P<d>[0-9]+)\.?\s+(?P<title>([\_‘♂])?[\*A-Z].+)')
-h5_pattern = re.compile(r'(?P<a>[0-9]+)(\.|\s)\s*(?P<b>[0-9]+)(\.|\s)\s*(?P<c>[0-9]+)(\.|\s)\s*(?P<d>[0-9]+)(\.|\s)\s*(?P<e>[0-9]+)\.?\s+(?P<title>([\_‘♂])?[\*A-Z].+)')
-_pageno_right_pattern = re.compile(r'(\x0c|###newpage###)\s+[^0-9]+(?P<no>[0-9]+)')
-_pageno_left_pattern = re.compile(r'(\x0c|###newpage###)(?P<no>[0-9]+)\s+[^0-9]+')
+# Page markers and headings of all levels are recognized in a single match: A heading of level n
+# starts with n numbers, separated by "." or whitespace, followed by the title. Since the separator
+# between numbers must be followed by a digit, the one before the title by a non-digit, there is
+# only one way to match a line.
+_line_pattern = re.compile(
+    r'(?:\x0c|###newpage###)(?:(?P<pageno>[0-9]+)\s+[^0-9]+|\s+[^0-9]+(?P<pageno_right>[0-9]+))\Z|'
+    r'(?P<numbers>[0-9]+(?:(?:\.|\s)\s*[0-9]+)*)\.?\s+(?P<title>[\_‘♂]?[\*mA-Z].+)')
+_number_pattern = re.compile(r'[0-9]+')
+# The characters a title may start with (after an optional prefix) per heading level:
+_TITLE_START = {
+    1: frozenset(string.ascii_uppercase),
+    2: frozenset(string.ascii_uppercase),
+    3: frozenset('m' + string.ascii_uppercase),
+    4: frozenset('*' + string.ascii_uppercase),
+    5: frozenset('*' + string.ascii_uppercase),
+}
 
 map_pattern = re.compile(r'(?P<type>Map|Figure)\s+(?P<num>[0-9]+[a-z]*(\.[0-9]+)?):')
 
 
+def classify_line(line):
+    """
+    Classify `line` as page marker, heading or plain line.
+
+    :return: `None` for a plain line, a pair `(None, pageno)` for a page marker or a pair \
+    `(numbers, title)` for a heading of level `len(numbers)` (between 1 and 5).
+    """
+    m = _line_pattern.match(line)
+    if not m:
+        return None
+    if m.group('numbers') is None:
+        return None, m.group('pageno') or m.group('pageno_right')
+    numbers, title = tuple(_number_pattern.findall(m.group('numbers'))), m.group('title')
+    if len(numbers) in _TITLE_START and \
+            title[1 if title[0] in '_‘♂' else 0] in _TITLE_START[len(numbers)]:
+        return numbers, title
+    return None
+
+
 def match_pageno(line):
-    m = _pageno_left_pattern.fullmatch(line) or _pageno_right_pattern.fullmatch(line)
-    if m:
-        return m.group('no')
+    c = classify_line(line)
+    if c and c[0] is None:
+        return c[1]
 
 
 def is_forms_line(line):
     return (re.match('-[A-Z]', line) or
-            (proto_pattern.match(line) or
-            witness_pattern.match(line) or
+            (match_proto(line) or
+            match_witness(line) or
             line.strip().startswith(CF_LINE_PREFIX)))
 
 
-def formblock(lines):
+# The kinds of lines distinguished by `tag_line`:
+LINE_KINDS = [
+    'prose', 'empty', 'page', 'heading', 'directive', 'cf', 'proto', 'witness', 'subgroup']
+PROSE, EMPTY, PAGE, HEADING, DIRECTIVE, CF, PROTO, WITNESS, SUBGROUP = range(len(LINE_KINDS))
+# The kinds of lines recognized by `is_forms_line`:
+FORMS_LINE_KINDS = frozenset([CF, PROTO, WITNESS, SUBGROUP])
+
+_directive_pattern = re.compile(r'<|>|__[a-z]+__')
+_subgroup_pattern = re.compile('-[A-Z]')
+
+
+def tag_line(line):
+    """
+    Determine the kind of a line.
+
+    :return: Pair (kind, fields) where kind is an index into `LINE_KINDS` and fields is the \
+    result of `classify_line` for page number lines and headings, else `None`.
+    """
+    if not line:
+        return EMPTY, None
+    c = classify_line(line)
+    if c:
+        return PAGE if c[0] is None else HEADING, c
+    if _directive_pattern.fullmatch(line):
+        return DIRECTIVE, None
+    if CF_LINE_PREFIX in line and line.strip().startswith(CF_LINE_PREFIX):
+        return CF, None
+    if match_proto(line):
+        return PROTO, None
+    if match_witness(line):
+        return WITNESS, None
+    if _subgroup_pattern.match(line):
+        return SUBGROUP, None
+    return PROSE, None
+
+
+class LineTags:
+    """
+    The kinds of a list of lines, stored as compact array, plus the fields captured for page
+    number lines and headings, keyed by line index.
+
+    Computing the tags in one pass, the extractors (`iter_blocks`, `formblock`, `split_chapters`,
+    `iter_chapters` and `make_paragraph`) don't have to match the same lines again.
+    """
+    def __init__(self, lines=None, kinds=None, fields=None):
+        self.kinds = array.array('B') if kinds is None else kinds
+        self.fields = fields or {}
+        for line in lines or []:
+            self.append(line)
+
+    def append(self, line):
+        kind, c = tag_line(line)
+        if c:
+            self.fields[len(self.kinds)] = c
+        self.kinds.append(kind)
+
+    def tagged(self, lines) -> typing.Iterator[str]:
+        """
+        Tag `lines` while iterating over them, i.e. the tags of a line are available once it has
+        been yielded. Thus, lines can be tagged and processed in one pass.
+        """
+        for line in lines:
+            self.append(line)
+            yield line
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, item: slice) -> 'LineTags':
+        start, stop, _ = item.indices(len(self.kinds))
+        return LineTags(
+            kinds=self.kinds[start:stop],
+            fields={i - start: c for i, c in self.fields.items() if start <= i < stop})
+
+
+def formblock(lines, kinds=None):
+    """
+    :param kinds: The kinds of the lines, as determined by `tag_line`.
+    """
     reg, cfs = [], []
     in_cf, cf, cfspec = False, [], None
 
-    for line in lines:
-        assert is_forms_line(line), line
-        if line.strip().startswith(CF_LINE_PREFIX):
+    for i, line in enumerate(lines):
+        if kinds is None:
+            assert is_forms_line(line), line
+            is_cf = line.strip().startswith(CF_LINE_PREFIX)
+        else:
+            assert kinds[i] in FORMS_LINE_KINDS, line
+            is_cf = kinds[i] == CF
+        if is_cf:
             in_cf = True
             if cf:  # There's already a previous cf block.
                 cfs.append((cfspec, cf))
@@ -56,17 +173,19 @@ def formblock(lines):
     return reg, cfs
 
 
-def igt_group(lines):
+def igt_group(lines, kinds=None):
     return lines
 
 
-def make_paragraph(lines, voldir) -> str:
+def make_paragraph(lines, voldir, kinds=None) -> str:
     """
     Lines starting with "|" are a quote.
     If first line is __ul__ ...
     If firts line is __pre__ ...
     Figure ...
     Map ...
+
+    :param kinds: The kinds of the lines, as determined by `tag_line`.
     """
     m = re.match(r'\:\s+\_*Table\s+(?P<num>[0-9\.]+)\_*', lines[0])
     if m:
@@ -76,8 +195,9 @@ def make_paragraph(lines, voldir) -> str:
     if lines[0] == '__blockquote__':
         return '> {}'.format(' '.join(line.strip() for line in lines[1:]))
     if lines[0] == '__formgroup__':
-        for line in lines[1:]:
-            assert is_forms_line(line) or '**' in line, line
+        for i, line in enumerate(lines[1:], start=1):
+            assert (kinds[i] in FORMS_LINE_KINDS if kinds else is_forms_line(line)) \
+                or '**' in line, line
         #print(len(line[1:]))
         return '\n'.join('' if line.strip() == '#' else line for line in lines[1:])
     if lines[0] == '__ul__':
@@ -133,127 +253,312 @@ def make_chapter(paras):
     return '\n\n'.join(regular + ['\n## Notes'] + endnotes)
 
 
-def iter_chapters(lines, voldir):
+def iter_chapters(lines, voldir, tags=None):
+    """
+    :param tags: `LineTags` of `lines` - if not given, lines are classified as needed.
+    """
     from pytlopo.parser.forms import strip_footnote_reference
 
-    chapter, toc, para = [], [], []
+    chapter, toc, para, para_kinds = [], [], [], []
     in_chapter = None
-    for line in lines:
-        m = h1_pattern.match(line)
-        if m:
+    for i, line in enumerate(lines):
+        c = classify_line(line) if tags is None else tags.fields.get(i)
+        if c and c[0] and len(c[0]) == 1:
             if in_chapter:
                 yield in_chapter, make_chapter(chapter), toc
-            chapter, toc, in_chapter = [], [], m.group('a')
+            chapter, toc, in_chapter = [], [], c[0][0]
             continue
 
         if not in_chapter:
             continue
 
-        pageno = match_pageno(line)
-        if pageno:  # Page number line.
-            chapter.append('\n<a id="p-{}"></a>'.format(pageno))
+        if c and c[0] is None:  # Page number line.
+            chapter.append('\n<a id="p-{}"></a>'.format(c[1]))
             continue
 
-        header = False
-        for level, pattern, link_format, number_format in [
-            (1, h2_pattern, 's-{b}', '{b}.'),
-            (2, h3_pattern, 's-{b}-{c}', '{b}.{c}.'),
-            (3, h4_pattern, 's-{b}-{c}-{d}', '{b}.{c}.{d}.'),
-            (4, h5_pattern, None, '{b}.{c}.{d}.{e}.'),
-        ]:
-            m = pattern.match(line)
-            if m:
-                number = number_format.format(**m.groupdict())
-                title = '{title}'.format(**m.groupdict())
-                if link_format:
-                    link = link_format.format(**m.groupdict())
-                    chapter.append('\n<a id="{}"></a>\n\n{} {} {}\n'.format(
-                        link, (level + 1) * '#', number, title))
-                    toc.append((level, link, strip_footnote_reference(title)[0]))
-                else:
-                    chapter.append('\n{} {} {}\n'.format((level + 1) * '#', number, title))
-                header = True
-                break
-        if header:
+        if c:  # A section heading.
+            numbers, title = c
+            level = len(numbers) - 1
+            number = ''.join(n + '.' for n in numbers[1:])
+            if level < 4:
+                link = 's-{}'.format('-'.join(numbers[1:]))
+                chapter.append('\n<a id="{}"></a>\n\n{} {} {}\n'.format(
+                    link, (level + 1) * '#', number, title))
+                toc.append((level, link, strip_footnote_reference(title)[0]))
+            else:
+                chapter.append('\n{} {} {}\n'.format((level + 1) * '#', number, title))
             continue
 
         if not line.strip():
             if para:
-                chapter.append(make_paragraph(para, voldir))
-                para = []
+                chapter.append(make_paragraph(para, voldir, para_kinds if tags else None))
+                para, para_kinds = [], []
         else:
             para.append(line)
+            if tags is not None:
+                para_kinds.append(tags.kinds[i])
 
     if para:
-        chapter.append(make_paragraph(para, voldir))
+        chapter.append(make_paragraph(para, voldir, para_kinds if tags else None))
     yield in_chapter, make_chapter(chapter), toc
 
 
-def extract_blocks(lines, factory=formblock, start='<', end='>'):
-    pageno = -1
-    block = []
+def iter_lines(p):
+    """
+    Read the lines of a UTF-8 encoded text file incrementally, yielding the same lines as
+    `p.read_text(encoding='utf8').split('\\n')`.
+    """
+    with open(p, encoding='utf8') as f:
+        line = None
+        for line in f:
+            yield line[:-1] if line.endswith('\n') else line
+        if line is None or line.endswith('\n'):
+            yield ''
+
+
+# Line breaks as recognized when reading text files with universal newlines:
+_newline_pattern = re.compile(rb'\r\n?|\n')
+
+
+class LineIndex:
+    """
+    Random access to the lines of a UTF-8 encoded text file - the same lines as
+    `p.read_text(encoding='utf8').split('\\n')` - using a memory map of the file and an index of
+    the byte spans of the lines. Lines are decoded only when accessed.
+
+    >>> with LineIndex(p) as lines:
+    ...     print(lines[41])
+    """
+    def __init__(self, p):
+        with open(p, 'rb') as f:
+            # Empty files cannot be mapped.
+            self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) \
+                if f.seek(0, 2) else b''
+        self.starts, self.ends = array.array('Q', [0]), array.array('Q')
+        for m in _newline_pattern.finditer(self._text):
+            self.ends.append(m.start())
+            self.starts.append(m.end())
+        self.ends.append(len(self._text))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if isinstance(self._text, mmap.mmap):
+            self._text.close()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, item) -> typing.Union[str, typing.List[str]]:
+        if isinstance(item, slice):
+            return [self._line(i) for i in range(len(self))[item]]
+        return self._line(range(len(self))[item])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._line(i)
+
+    def _line(self, i):
+        return self._text[self.starts[i]:self.ends[i]].decode('utf8')
+
+    def span(self, i) -> typing.Tuple[int, int]:
+        """
+        :return: Byte offsets of the start and end of line `i` - excluding the line break.
+        """
+        i = range(len(self))[i]
+        return self.starts[i], self.ends[i]
+
+
+def iter_blocks(lines, kinds, pageno=-1, keep_lines=True, tags=None, lineno=0):
+    """
+    Extract blocks of several kinds from `lines` in one pass.
+
+    :param kinds: Mapping of block kind names to triples (factory, start marker, end marker), \
+    where an end marker of `None` means blocks end at the next empty line.
+    :param pageno: Page number in effect at the start of `lines`.
+    :param keep_lines: If `False`, the rewritten lines are not collected and `None` is returned.
+    :param tags: `LineTags` of `lines` - if not given, lines are classified as needed. If given, \
+    the factories are called with the kinds of the block lines as keyword argument `kinds`.
+    :param lineno: Index of the first of `lines` in the text.
+    :return: Generator yielding tuples (kind, h1, h2, h3, pageno, block, span), expecting the \
+    text to replace the block with to be sent back, and returning the list of rewritten lines. \
+    `span` is the pair (start, end) of line indices delimiting the block - including its markers - \
+    in the text, i.e. the block lines are `text[start:end]`.
+    """
+    starts = {start: kind for kind, (_, start, _) in kinds.items()}
+    ends = {end: kind for kind, (_, _, end) in kinds.items() if end}
+    block, block_kinds, block_start = [], [], None
     h1, h2, h3 = None, None, None
-    in_block = False
+    kind, factory, start, end = None, None, None, None  # The kind of block we are in, if any.
 
-    new_lines = []
+    def make_block():
+        return factory(block) if tags is None else factory(block, kinds=block_kinds)
+
+    new_lines = [] if keep_lines else None
+    append = new_lines.append if keep_lines else lambda line: None
     for i, line in enumerate(lines, start=1):
-        m = match_pageno(line)
-        if m:  # Page number line.
-            pageno = int(m)
-            assert not in_block, pageno
-            new_lines.append(line)
+        c = classify_line(line) if tags is None else tags.fields.get(i - 1)
+        if c and c[0] is None:  # Page number line.
+            pageno = int(c[1])
+            assert not kind, pageno
+            append(line)
             continue
 
         if not line:  # Empty line.
-            if not end and in_block:  # implicit end of block
+            if not end and kind:  # implicit end of block
                 assert block, i
-                etymon_id = yield h1, h2, h3, pageno, factory(block)
-                in_block = False
-                new_lines.append(etymon_id)
-                new_lines.append('')
+                etymon_id = yield kind, h1, h2, h3, pageno, make_block(), \
+                    (block_start, lineno + i - 1)
+                kind, factory, start, end = None, None, None, None
+                append(etymon_id)
+                append('')
                 continue
 
-            #assert not in_block, pageno
-            if not in_block:
-                new_lines.append(line)
+            if not kind:
+                append(line)
             continue
 
-        if line == start:  # Etymon start marker.
-            assert not in_block, i
-            in_block = True
-            block = []
+        if (not kind and line in starts) or (kind and line == start):  # Block start marker.
+            assert not kind, i
+            kind = starts[line]
+            factory, start, end = kinds[kind]
+            block, block_kinds, block_start = [], [], lineno + i - 1
             continue
-        if end and line == end:  # Etymon end marker.
-            assert block, i
-            etymon_id = yield h1, h2, h3, pageno, factory(block)
-            assert in_block, i
-            in_block = False
-            new_lines.append(etymon_id)
+        if (not kind and line in ends) or (end and line == end):  # Block end marker.
+            assert kind and block, i
+            etymon_id = yield kind, h1, h2, h3, pageno, make_block(), (block_start, lineno + i)
+            kind, factory, start, end = None, None, None, None
+            append(etymon_id)
             continue
 
-        if not in_block:
-            m = h1_pattern.match(line)
-            if m:
-                h1 = (m.group('a'), m.group('title'))
-                h2, h3 = None, None
-            else:
-                m = h2_pattern.match(line)
-                if m:
+        if not kind:
+            if c:
+                numbers, title = c
+                if len(numbers) == 1:
+                    h1 = (numbers[0], title)
+                    h2, h3 = None, None
+                elif len(numbers) == 2:
                     assert h1, line
-                    assert m.group('a') == h1[0], (line, h1)
-                    h2 = (m.group('b'), m.group('title'))
+                    assert numbers[0] == h1[0], (line, h1)
+                    h2 = (numbers[1], title)
                     h3 = None
-                else:
-                    m = h3_pattern.match(line)
-                    if m:
-                        assert h2 and m.group('b') == h2[0], line
-                        h3 = (m.group('c'), m.group('title'))
-            new_lines.append(line)
+                elif len(numbers) == 3:
+                    assert h2 and numbers[1] == h2[0], line
+                    h3 = (numbers[2], title)
+            append(line)
         else:
             block.append(line)
+            if tags is not None:
+                block_kinds.append(tags.kinds[i - 1])
     return new_lines
 
 
+def replace_blocks(lines, tags, links) -> typing.Tuple[typing.Iterator[str], LineTags]:
+    """
+    Replace blocks with links - as in the rewritten lines returned by `iter_blocks` - reading
+    `lines` lazily.
+
+    :param lines: Sequence of lines, e.g. a `LineIndex`.
+    :param tags: `LineTags` of `lines`.
+    :param links: List of triples (start, end, link), sorted by start, where `lines[start:end]` is \
+    a block to be replaced with the line `link`.
+    :return: Pair (iterator over the rewritten lines, `LineTags` of the rewritten lines).
+    """
+    segments, pos = [], 0
+    for start, end, link in links:
+        segments.append((pos, start, link))
+        pos = end
+    segments.append((pos, len(lines), None))
+
+    res, fields = LineTags(), sorted(tags.fields)
+    for start, end, link in segments:
+        offset = len(res) - start
+        for i in fields[bisect.bisect_left(fields, start):bisect.bisect_left(fields, end)]:
+            res.fields[i + offset] = tags.fields[i]
+        res.kinds.extend(tags.kinds[start:end])
+        if link is not None:
+            res.append(link)
+
+    def iter_lines():
+        for start, end, link in segments:
+            for i in range(start, end):
+                yield lines[i]
+            if link is not None:
+                yield link
+    return iter_lines(), res
+
+
+def extract_blocks(lines, factory=formblock, start='<', end='>', tags=None):
+    """
+    :return: Generator yielding tuples (h1, h2, h3, pageno, block), see `iter_blocks`.
+    """
+    blocks = iter_blocks(lines, {'block': (factory, start, end)}, tags=tags)
+    try:
+        block = next(blocks)
+        while True:
+            block = blocks.send((yield block[1:-1]))
+    except StopIteration as e:
+        return e.value
+
+
+# The kinds of blocks which are extracted from the text and parsed into objects:
+BLOCK_KINDS = collections.OrderedDict([
+    ('etymon', (formblock, '<', '>')),
+    ('formgroup', (lambda lines, kinds=None: lines, '__formgroup__', None)),
+    ('igt', (igt_group, '__igt__', None)),
+])
 extract_etyma = extract_blocks
 extract_igts = functools.partial(extract_blocks, factory=igt_group, start='__igt__', end=None)
 extract_formgroups = functools.partial(extract_blocks, factory=lambda lines: lines, start='__formgroup__', end=None)
+extract_all_blocks = functools.partial(iter_blocks, kinds=BLOCK_KINDS)
+
+
+def index_chapters(lines, kinds=BLOCK_KINDS, tags=None):
+    """
+    Index the chunks of `lines` split before each chapter heading outside of blocks - i.e. where
+    `iter_blocks` resets the heading state, such that each chunk can be parsed on its own.
+
+    :param tags: `LineTags` of `lines` - if not given, lines are classified as needed.
+    :return: List of tuples (start, end, first page, last page, counts) where `lines[start:end]` \
+    is the chunk, first page is the page number in effect at the start of the chunk, last page \
+    the one at its end and counts is a `dict` mapping block kinds to the number of blocks of the \
+    kind before the chunk.
+    """
+    starts = {start: (kind, end) for kind, (_, start, end) in kinds.items()}
+    res, counts, pageno, in_block, end = [], {kind: 0 for kind in kinds}, -1, False, None
+    chunk = (0, pageno, dict(counts))
+    i = -1
+    for i, line in enumerate(lines):
+        c = classify_line(line) if tags is None else tags.fields.get(i)
+        if c and c[0] is None:
+            pageno = int(c[1])
+        elif not line:
+            if in_block and not end:
+                in_block = False
+        elif not in_block:
+            if line in starts:
+                kind, end = starts[line]
+                in_block, counts[kind] = True, counts[kind] + 1
+            elif c and len(c[0]) == 1 and i > chunk[0]:
+                res.append((chunk[0], i, chunk[1], pageno, chunk[2]))
+                chunk = (i, pageno, dict(counts))
+        elif end and line == end:
+            in_block = False
+    res.append((chunk[0], i + 1, chunk[1], pageno, chunk[2]))
+    return res
+
+
+def split_chapters(lines, kinds=BLOCK_KINDS, tags=None):
+    """
+    Split `lines` before each chapter heading outside of blocks, see `index_chapters`.
+
+    :param tags: `LineTags` of `lines` - if not given, lines are classified as needed.
+    :return: List of pairs (page number in effect at the start of the chunk, list of lines).
+    """
+    return [
+        (pageno, lines[start:end])
+        for start, end, pageno, _, _ in index_chapters(lines, kinds=kinds, tags=tags)]
@@ -39,6 +39,8 @@ CROSS_REF_PATTERN_PAGES = re.compile(  # -> 1 #p-<page>  or  (vol.4:278)
 
 FIGURE_REF_PATTERN = re.compile(r'(?P<type>Table|Figure|Map)\s+(?P<num>[0-9]+(\.[0-9]+)?)')
 
+PAGES_PATTERN = re.compile(r'\:\s*(?P<pages>[0-9]+([,;-]\s*[0-9]+)*)\)')  # (Author 2000: 12-15)
+
 
 
 def key_to_regex(key, in_text=True):
@@ -63,6 +65,54 @@ def key_to_regex(key, in_text=True):
     return re.compile(r"\({}\)".format(comps[0]))
 
 
+# The leading run of letters of a name.
+LEADING_LETTERS_PATTERN = re.compile(r'[^\W\d_]*')
+CITATION_QUALIFIER_PATTERN = re.compile(r'(after|from)\s+')
+
+
+def index_key(key):
+    """
+    Compute the string used to index a source for lookup of bracketed citations, i.e. the leading
+    letters of the first author name.
+
+    :return: `None` if the citation pattern for `key` does not start with a literal author name.
+    """
+    comps = key.split()
+    if not comps or comps[0] in {'&', 'and'}:
+        return None
+    if len(comps) == 1 and re.escape(comps[0]) != comps[0]:
+        # Single-token keys are not escaped when turned into a regex, see `key_to_regex`.
+        return None
+    return LEADING_LETTERS_PATTERN.match(comps[0]).group() or None
+
+
+def mention_key(key):
+    """
+    Compute the literal string an in-text citation of `key` (as matched by the pattern returned
+    from `key_to_regex`) must start with.
+
+    :return: `None` if there is no such literal string.
+    """
+    comps = key.split()
+    if not comps:
+        return None
+    if len(comps) > 1:
+        return None if comps[0] in {'&', 'and'} else comps[0]
+    return comps[0] if re.escape(comps[0]) == comps[0] else None
+
+
+def citation_index_keys(s):
+    """
+    Compute the index keys of all sources which may match the bracketed citation `s`.
+    """
+    s = s[1:]
+    res = {LEADING_LETTERS_PATTERN.match(s).group()}
+    m = CITATION_QUALIFIER_PATTERN.match(s)
+    if m:
+        res.add(LEADING_LETTERS_PATTERN.match(s, m.end()).group())
+    return res
+
+
 def search(s, *keys, **kw):
     for key in keys:
         for m in key_to_regex(key, **kw).finditer(s):
@@ -0,0 +1,166 @@
+"""
+Profiling of the catalogue of compiled regular expressions used by the parser.
+
+>>> with profile_patterns() as profile:
+...     _ = vol.chapters
+>>> print(profile)
+
+While profiling, each module-level `re.Pattern` in the `pytlopo` modules is replaced by a proxy
+recording calls, hits, misses and cumulative time per pattern. Patterns are named after the
+module which defines them (see `CATALOGUE`) and the attribute name.
+
+Note: Only patterns used in the current process are profiled, i.e. volumes should be parsed with
+`workers=1`.
+"""
+import re
+import sys
+import time
+import typing
+import contextlib
+import dataclasses
+import collections
+
+from tabulate import tabulate
+
+__all__ = ['profile_patterns', 'PatternStats', 'Profile']
+
+# The modules defining the pattern catalogue, in order of precedence for naming patterns.
+CATALOGUE = [
+    'pytlopo.config',
+    'pytlopo.parser.lines',
+    'pytlopo.parser.forms',
+    'pytlopo.parser.refs',
+]
+
+
+@dataclasses.dataclass
+class PatternStats:
+    name: str
+    pattern: str
+    calls: int = 0
+    hits: int = 0
+    misses: int = 0
+    seconds: float = 0.0
+
+    def add(self, seconds, hit):
+        self.calls += 1
+        self.seconds += seconds
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+
+class ProfiledPattern:
+    """
+    Proxy for a compiled pattern, recording the calls of its matching methods.
+
+    A call is counted as hit if it matched - or, for `finditer`, `findall`, `sub`, `subn` and
+    `split` - if it found at least one match.
+    """
+    def __init__(self, pattern: re.Pattern, stats: PatternStats):
+        self._pattern = pattern
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._pattern, name)
+
+    def _call(self, method, args, kw, hit=lambda res: res is not None):
+        start = time.perf_counter()
+        res = getattr(self._pattern, method)(*args, **kw)
+        self._stats.add(time.perf_counter() - start, hit(res))
+        return res
+
+    def match(self, *args, **kw):
+        return self._call('match', args, kw)
+
+    def fullmatch(self, *args, **kw):
+        return self._call('fullmatch', args, kw)
+
+    def search(self, *args, **kw):
+        return self._call('search', args, kw)
+
+    def findall(self, *args, **kw):
+        return self._call('findall', args, kw, hit=bool)
+
+    def split(self, *args, **kw):
+        return self._call('split', args, kw, hit=lambda res: len(res) > 1)
+
+    def subn(self, *args, **kw):
+        return self._call('subn', args, kw, hit=lambda res: res[1] > 0)
+
+    def sub(self, *args, **kw):
+        return self.subn(*args, **kw)[0]
+
+    def finditer(self, *args, **kw):
+        seconds, n = 0.0, 0
+        start = time.perf_counter()
+        it = self._pattern.finditer(*args, **kw)
+        try:
+            while True:
+                try:
+                    m = next(it)
+                finally:
+                    seconds += time.perf_counter() - start
+                n += 1
+                yield m
+                start = time.perf_counter()
+        except StopIteration:
+            pass
+        finally:
+            self._stats.add(seconds, n > 0)
+
+
+class Profile:
+    def __init__(self):
+        self.stats = collections.OrderedDict()
+
+    def report(self) -> typing.List[dict]:
+        """
+        :return: The stats of the patterns which were used, most expensive first.
+        """
+        return [
+            dataclasses.asdict(s) for s in
+            sorted(self.stats.values(), key=lambda s: -s.seconds) if s.calls]
+
+    def __str__(self):
+        return tabulate(
+            [[s['name'], s['calls'], s['hits'], s['misses'], s['seconds'],
+              s['seconds'] / s['calls'] * 1e6] for s in self.report()],
+            headers=['pattern', 'calls', 'hits', 'misses', 'seconds', 'µs/call'],
+            floatfmt='.3f')
+
+
+def _iter_patterns(modules):
+    for modname in modules:
+        mod = sys.modules.get(modname)
+        if mod:
+            for name, obj in sorted(vars(mod).items()):
+                if isinstance(obj, re.Pattern):
+                    yield mod, name, obj
+
+
+@contextlib.contextmanager
+def profile_patterns(modules=None) -> typing.Generator[Profile, None, None]:
+    """
+    :param modules: Names of the modules in which to replace the patterns; defaults to all \
+    loaded `pytlopo` modules - which includes the modules importing patterns from the catalogue.
+    """
+    # Make sure the catalogue modules are loaded.
+    import pytlopo.models  # noqa: F401
+
+    profile, proxies, patched = Profile(), {}, []
+    modules = modules or sorted(m for m in sys.modules if m.split('.')[0] == 'pytlopo')
+    for mod, name, obj in _iter_patterns(CATALOGUE + [m for m in modules if m not in CATALOGUE]):
+        if id(obj) not in proxies:  # The same pattern may be imported into several modules.
+            stats = PatternStats('{}.{}'.format(mod.__name__.split('.')[-1], name), obj.pattern)
+            profile.stats[stats.name] = stats
+            proxies[id(obj)] = ProfiledPattern(obj, stats)
+    for mod, name, obj in list(_iter_patterns(modules)):
+        setattr(mod, name, proxies[id(obj)])
+        patched.append((mod, name, obj))
+    try:
+        yield profile
+    finally:
+        for mod, name, obj in patched:
+            setattr(mod, name, obj)
@@ -0,0 +1,294 @@
+"""
+Generate synthetic corpora in the TloPO input format, e.g. for benchmarking the parser at scale.
+
+The generated data is random, but deterministic for a given seed, and exercises the markup the
+parser supports: headings, page markers, etymon blocks with `cf. also` sections and subgroups,
+`__igt__` and `__formgroup__` blocks, footnotes and citations of the generated bibliography.
+
+Usage:
+
+>>> counts = generate(pathlib.Path('synthetic'), scale=10, seed=1)
+
+or from the command line
+
+    python -m pytlopo.synthetic synthetic --scale 10 --seed 1
+"""
+import random
+import pathlib
+import argparse
+import collections
+
+from clldutils import jsonlib
+from csvw.dsv import UnicodeWriter
+
+from pytlopo.config import GROUPS
+
+__all__ = ['generate']
+
+CONSONANTS = 'p t k m n ŋ s r l w y b d g q R'.split()
+VOWELS = 'a e i o u'.split()
+PROTOLANGUAGES = ['POc', 'PWOc', 'PEOc', 'PMP']
+POS = ['N', 'V', 'VI', 'VT', 'ADJ', 'N LOC']
+WORDS = """
+house post roof canoe paddle sail net hook spear garden yam taro coconut banana pig dog bird fish
+shell stone wood leaf root fire water sea reef island village path mat basket pot knife string rope
+sit stand walk run cut split scrape grate cook eat drink plant dig burn carry tie weave fold build
+big small long short old new red white black good bad sharp blunt wet dry""".split()
+MORPHEME_GLOSSES = ['ART', 'TR', 'POSS', 'PL', 'CAUS', 'RECP', 'DIR', 'LOC']
+SURNAMES = """
+Blust Capell Clark Codrington Dempwolff Geraghty Grace Hooley Lichtenberk Lynch Milke Osmond
+Pawley Ross Tryon Lincoln Chowning Bender Tent Jackson Biggs Churchward Ivens Fox Hazlewood
+Lister-Turner Kirch Green Schmidt Ray Friederici Chinnery Cashmore Sharpe Early""".split()
+TITLES = """
+Introduction Houses Settlements Canoes Tools Plants Animals Fishing Gardening Cooking Weaving
+Trade Kinship Colours Winds Stars Shapes Numbers Motion Speech Body Sickness Rituals""".split()
+
+
+class Generator:
+    def __init__(self, seed=0, languages=200, sources=100):
+        self.rng = random.Random(seed)
+        self.forms = set()
+        self.languages = collections.OrderedDict()
+        groups = [g for g in GROUPS if g.isalpha()][:12]
+        while len(self.languages) < languages:
+            name = self.word(syllables=self.rng.randint(2, 3)).capitalize()
+            if self.rng.random() < 0.1:
+                name += ' ' + self.word(syllables=2).capitalize()
+            if set(name) <= set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ '):
+                self.languages[name] = self.rng.choice(groups)
+        self.sources = collections.OrderedDict()
+        while len(self.sources) < sources:
+            authors = self.rng.sample(SURNAMES, self.rng.choice([1, 1, 1, 2]))
+            year = self.rng.randint(1880, 2020)
+            key = '{} {}'.format(' & '.join(authors), year)
+            self.sources[''.join(a.replace('-', '') for a in authors).lower() + str(year)] = key
+
+    def word(self, syllables=None):
+        return ''.join(
+            self.rng.choice(CONSONANTS) + self.rng.choice(VOWELS)
+            for _ in range(syllables or self.rng.randint(1, 3))).replace('R', 'r')
+
+    def unique_form(self):
+        while True:
+            form = self.word(syllables=self.rng.randint(2, 4))
+            if form not in self.forms:
+                self.forms.add(form)
+                return form
+
+    def gloss(self, pos=False):
+        res = "'{}'".format(' '.join(self.rng.sample(WORDS, self.rng.randint(1, 3))))
+        if pos and self.rng.random() < 0.3:
+            res = '({}) {}'.format(self.rng.choice(POS), res)
+        r = self.rng.random()
+        if r < 0.1:
+            res += " ({})".format(self.citation())
+        elif r < 0.2:
+            res += " (of {})".format(self.rng.choice(WORDS))
+        if self.rng.random() < 0.2:
+            res += "; '{}'".format(self.rng.choice(WORDS))
+        return res
+
+    def citation(self, pages=False):
+        key = self.rng.choice(list(self.sources.values()))
+        if pages:
+            key += ': {}'.format(self.rng.randint(1, 400))
+        return key
+
+    def language(self):
+        return self.rng.choice(list(self.languages.items()))
+
+    def reflex(self, footnotes=None):
+        lang, group = self.language()
+        r = self.rng.random()
+        if r < 0.05:
+            form = '|{} {}|'.format(self.word(), self.word())
+        elif r < 0.1:
+            form = '{}, {}'.format(self.word(), self.word())
+        elif r < 0.2:
+            form = '{}-{}'.format(self.word(), self.word(syllables=1))
+        else:
+            form = self.word()
+        res = ' {}: {} {} {}'.format(group, lang, form, self.gloss(pos=True))
+        if footnotes is not None and self.rng.random() < 0.05:
+            footnotes.append(self.sentence())
+            res += ' [{}]'.format(len(footnotes))
+        return res
+
+    def protoform(self, pl=None):
+        form = self.unique_form()
+        if self.rng.random() < 0.15:
+            i = self.rng.randrange(1, len(form))
+            form = '{}({}){}'.format(form[:i], self.rng.choice(CONSONANTS), form[i:])
+        return '{} *{} {}'.format(pl or self.rng.choice(PROTOLANGUAGES[:3]), form, self.gloss())
+
+    def etymon(self, footnotes):
+        lines = ['<', self.protoform(pl='POc')]
+        if self.rng.random() < 0.3:
+            lines.insert(1, self.protoform(pl='PMP'))
+        for _ in range(self.rng.randint(0, 2)):
+            lines.append(self.protoform())
+        if self.rng.random() < 0.2:
+            lines.append('-{}'.format(self.rng.choice(['Western', 'Eastern', 'Central'])))
+        lines.extend(self.reflex(footnotes) for _ in range(self.rng.randint(2, 12)))
+        for spec in self.rng.choice([[], [], ['']] + [['', 'Loans']]):
+            lines.append('cf. also:{}'.format(' ' + spec if spec else ''))
+            lines.extend(self.reflex() for _ in range(self.rng.randint(1, 3)))
+        lines.append('>')
+        return lines
+
+    def igt(self, number):
+        lang, group = self.language()
+        words, glosses = [], []
+        for _ in range(self.rng.randint(2, 5)):
+            if self.rng.random() < 0.3:
+                words.append('{}-{}'.format(self.word(1), self.word()))
+                glosses.append('{}-{}'.format(
+                    self.rng.choice(MORPHEME_GLOSSES), self.rng.choice(WORDS)))
+            else:
+                words.append(self.word())
+                glosses.append(self.rng.choice(WORDS))
+        translation = "'{}'".format(' '.join(self.rng.sample(WORDS, len(words))))
+        if self.rng.random() < 0.5:
+            translation += ' ({})'.format(self.citation(pages=True))
+        return [
+            '__igt__',
+            '  ({}) {} ({})'.format(number, lang, group),
+            '  ' + ' '.join(words),
+            '  ' + ' '.join(glosses),
+            '  ' + translation,
+        ]
+
+    def formgroup(self):
+        return ['__formgroup__'] + [self.reflex() for _ in range(self.rng.randint(1, 4))]
+
+    def sentence(self):
+        words = self.rng.sample(WORDS, self.rng.randint(5, 12))
+        return '{} {}.'.format(words[0].capitalize(), ' '.join(words[1:]))
+
+    def paragraph(self, footnotes, sections):
+        sentences = [self.sentence() for _ in range(self.rng.randint(2, 6))]
+        r = self.rng.random()
+        if r < 0.3:
+            author, _, year = self.citation().rpartition(' ')
+            sentences.append('This follows {} ({}).'.format(author, year))
+        elif r < 0.5:
+            sentences[-1] = sentences[-1][:-1] + ' ({}).'.format(self.citation(pages=True))
+        if sections and self.rng.random() < 0.2:
+            sentences.append('See also §{}.'.format(self.rng.choice(sections)))
+        if self.rng.random() < 0.1:
+            footnotes.append(self.sentence())
+            sentences[0] = sentences[0][:-1] + '[{}].'.format(len(footnotes))
+        # Wrap the text into lines of roughly equal length.
+        words, lines = ' '.join(sentences).split(), []
+        while words:
+            lines.append(' '.join(words[:12]))
+            words = words[12:]
+        return lines
+
+    def chapter(self, number, pageno, sections=3):
+        """
+        :return: pair (lines, number of the last page)
+        """
+        title = self.rng.choice(TITLES)
+        lines, units, footnotes, igts = [], [], [], 0
+        lines.append('{} {}'.format(number, title))
+        lines.append('')
+        refs = []
+        for s in range(1, sections + 1):
+            units.append(['{}.{} {}'.format(number, s, self.rng.choice(TITLES))])
+            refs.append('{}.{}'.format(number, s))
+            for ss in range(1, self.rng.randint(1, 3) + 1):
+                units.append(['{}.{}.{} {}'.format(number, s, ss, self.rng.choice(TITLES))])
+                units.append(self.paragraph(footnotes, refs))
+                for _ in range(self.rng.randint(1, 4)):
+                    units.append(self.etymon(footnotes))
+                    if self.rng.random() < 0.5:
+                        units.append(self.paragraph(footnotes, refs))
+                if self.rng.random() < 0.5:
+                    igts += 1
+                    units.append(self.igt(igts))
+                if self.rng.random() < 0.3:
+                    units.append(self.formgroup())
+                units.append(self.paragraph(footnotes, refs))
+        for i, unit in enumerate(units):
+            lines.extend(unit)
+            lines.append('')
+            if i % 3 == 2:  # Page break.
+                pageno += 1
+                if pageno % 2:
+                    lines.append('\x0c    {}    {}'.format(title, pageno))
+                else:
+                    lines.append('###newpage###{} {}'.format(pageno, title))
+                lines.append('')
+        for i, note in enumerate(footnotes, start=1):
+            lines.extend(['[{}] {}'.format(i, note), ''])
+        return lines, pageno
+
+
+def generate(d, scale=1, seed=0, volumes=1, languages=200, sources=100) -> collections.Counter:
+    """
+    Write a synthetic corpus to directory `d`, i.e. `etc/languages.csv`, `etc/sources.bib` and
+    `raw/vol<N>/{md.json,text.txt}`.
+
+    :param scale: Factor for the size of the chapters - the number of sections per chapter.
+    :param volumes: Number of volumes, at most 9.
+    :return: Counter of the generated etyma, IGTs, form groups, chapters and pages.
+    """
+    assert 1 <= volumes <= 9
+    d = pathlib.Path(d)
+    gen = Generator(seed=seed, languages=languages, sources=sources)
+    counts = collections.Counter()
+
+    d.joinpath('etc').mkdir(parents=True, exist_ok=True)
+    with UnicodeWriter(d / 'etc' / 'languages.csv') as w:
+        w.writerow(['ID', 'Name', 'Group'])
+        for i, (name, group) in enumerate(gen.languages.items(), start=1):
+            w.writerow(['lang{}'.format(i), name, group])
+    d.joinpath('etc', 'sources.bib').write_text('\n'.join(
+        '@article{{{},\n    author = {{{}}},\n    title = {{{}}},\n    key = {{{}}},\n'
+        '    year = {{{}}},\n}}'.format(
+            srcid, key.rpartition(' ')[0].replace(' & ', ' and '), gen.sentence(), key,
+            key.rpartition(' ')[2])
+        for srcid, key in gen.sources.items()), encoding='utf8')
+
+    for num in range(1, volumes + 1):
+        voldir = d / 'raw' / 'vol{}'.format(num)
+        voldir.mkdir(parents=True, exist_ok=True)
+        lines, chapters, pageno = [], [], 0
+        for number in range(1, 10):
+            start = pageno + 1
+            clines, pageno = gen.chapter(number, start, sections=3 * scale)
+            lines.extend(clines)
+            chapters.append(dict(
+                number=str(number),
+                title=clines[0].partition(' ')[2],
+                pages='{}-{}'.format(start, pageno),
+                author=gen.rng.choice(SURNAMES)))
+            counts.update(
+                etyma=clines.count('<'),
+                igts=clines.count('__igt__'),
+                formgroups=clines.count('__formgroup__'),
+                chapters=1)
+        counts.update(pages=pageno)
+        jsonlib.dump(
+            dict(title='Synthetic volume {}'.format(num), chapters=chapters),
+            voldir / 'md.json',
+            indent=2)
+        voldir.joinpath('text.txt').write_text('\n'.join(lines), encoding='utf8')
+    return counts
+
+
+def main(args=None):  # pragma: no cover
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('directory', type=pathlib.Path)
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--volumes', type=int, default=1)
+    args = parser.parse_args(args)
+    for k, v in sorted(generate(
+            args.directory, scale=args.scale, seed=args.seed, volumes=args.volumes).items()):
+        print(k, v)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,66 @@
+"""
+Tracing of the parsing pipeline, exported in the Chrome trace-event format - which can be opened
+in chrome://tracing or https://ui.perfetto.dev
+
+>>> corpus = Corpus(repos / 'raw', langs, bib, sources, trace=True)
+>>> corpus.tracer.dump('trace.json')
+
+Spans recorded in worker processes are sent back to the parent process with the parse results.
+Timestamps are taken from `time.perf_counter_ns`, which is system-wide on common platforms, thus
+spans from different processes line up on the same timeline.
+"""
+import os
+import json
+import time
+import pathlib
+import threading
+import contextlib
+
+__all__ = ['Tracer']
+
+
+class Tracer:
+    def __init__(self, events=None):
+        self.events = events or []
+
+    @contextlib.contextmanager
+    def span(self, name, cat='pytlopo', **args):
+        """
+        Record the execution of the block as "complete" event.
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.events.append(dict(
+                name=name,
+                cat=cat,
+                ph='X',
+                ts=start / 1000,
+                dur=(time.perf_counter_ns() - start) / 1000,
+                pid=os.getpid(),
+                tid=threading.get_native_id(),
+                args={k: v for k, v in args.items() if v is not None}))
+
+    def pop(self) -> list:
+        """
+        :return: The events recorded so far, removing them from the tracer.
+        """
+        res, self.events = self.events, []
+        return res
+
+    def extend(self, events):
+        self.events.extend(events)
+
+    def as_json(self) -> dict:
+        pids = {e['pid'] for e in self.events}
+        meta = [
+            dict(name='process_name', ph='M', pid=pid, args=dict(
+                name='main' if pid == os.getpid() else 'worker {}'.format(pid)))
+            for pid in sorted(pids)]
+        return dict(
+            traceEvents=meta + sorted(self.events, key=lambda e: e['ts']),
+            displayTimeUnit='ms')
+
+    def dump(self, p):
+        pathlib.Path(p).write_text(json.dumps(self.as_json()), encoding='utf8')
@@ -1,3 +1,70 @@
+import re
+import typing
+import functools
+
+
+class Trie:
+    """
+    A prefix tree mapping strings to values, supporting longest-prefix lookup.
+    """
+    def __init__(self, items=None):
+        self.root = {}
+        for key, value in (items or {}).items():
+            self[key] = value
+
+    def __setitem__(self, key, value):
+        node = self.root
+        for c in key:
+            node = node.setdefault(c, {})
+        node[None] = (key, value)  # `None` marks the end of a key.
+
+    def __contains__(self, key):
+        node = self.root
+        for c in key:
+            if c not in node:
+                return False
+            node = node[c]
+        return None in node
+
+    def prefixes(self, s):
+        """
+        :return: List of `(key, value)` pairs for all keys which are prefixes of `s`.
+        """
+        node, res = self.root, []
+        for c in s:
+            if None in node:
+                res.append(node[None])
+            if c not in node:
+                return res
+            node = node[c]
+        if None in node:
+            res.append(node[None])
+        return res
+
+    def regex(self):
+        """
+        :return: A regular expression (as string) matching any key, preferring longer keys.
+        """
+        def node_regex(node):
+            branches = [re.escape(c) + node_regex(node[c]) for c in sorted(k for k in node if k)]
+            if not branches:
+                return ''
+            if None in node:
+                return '(?:{})?'.format('|'.join(branches))
+            return branches[0] if len(branches) == 1 else '(?:{})'.format('|'.join(branches))
+        return node_regex(self.root)
+
+    def longest_prefix(self, s):
+        """
+        :return: `(key, value)` pair for the longest key which is a prefix of `s` or `None`.
+        """
+        node, res = self.root, None
+        for c in s:
+            res = node.get(None, res)
+            if c not in node:
+                return res
+            node = node[c]
+        return node.get(None, res)
 
 
 def strip_morphemeseparator(f):
@@ -8,10 +75,12 @@ def strip_morphemeseparator(f):
     return f.replace('-', '')
 
 
-def variants(f):
-    # a(x)b -> axb, ab
-    # a(x,y)b -> axb, ayb
-    # a((x,y))b -> axb, ayb, ab
+@functools.lru_cache(maxsize=2**16)
+def _split_variants(f) -> typing.Tuple[typing.Tuple[str, ...], str]:
+    """
+    Splits a form into the variants of its head - i.e. everything up to and including the first
+    bracketed part - and the remainder.
+    """
     v = []
     level = 0
     prefix, bracketed = '', ''
@@ -48,10 +117,52 @@ def variants(f):
                 v.append(prefix + bracketed)
     elif prefix:
         v.append(prefix)
+    return tuple(v), f[i + 1:]
 
-    rem = f[i + 1:]
-    if rem:
-        v = [vv + yy for vv in v for yy in variants(rem)]
+
+@functools.lru_cache(maxsize=2**16)
+def _variants(f) -> typing.Tuple[str, ...]:
+    v, rem = _split_variants(f)
+    if rem and v:
+        tails = _variants(rem)
+        v = [vv + yy for vv in v for yy in tails]
 
     assert len(set(v)) == len(v), v
-    return [strip_morphemeseparator(vv) for vv in sorted(v)]
+    return tuple(strip_morphemeseparator(vv) for vv in sorted(v))
+
+
+def variants(f) -> typing.List[str]:
+    """
+    Expands bracketed alternatives and optional parts of a form, e.g.
+
+    - a(x)b -> axb, ab
+    - a(x,y)b -> axb, ayb
+    - a((x,y))b -> axb, ayb, ab
+
+    Expansions are memoized, so repeated forms are cheap.
+    """
+    return list(_variants(f))
+
+
+def count_variants(f) -> int:
+    """
+    The number of variants of a form, computed without expanding them.
+
+    Note: Unlike `variants`, this does not check whether the expansion is ambiguous.
+    """
+    v, rem = _split_variants(f)
+    return len(v) * (count_variants(rem) if rem and v else 1)
+
+
+def iter_variants(f) -> typing.Generator[str, None, None]:
+    """
+    Lazily yields the variants of a form - not sorted, and without the ambiguity check done by
+    `variants`.
+    """
+    v, rem = _split_variants(f)
+    for vv in v:
+        if rem:
+            for yy in iter_variants(rem):
+                yield strip_morphemeseparator(vv + yy)
+        else:
+            yield strip_morphemeseparator(vv)
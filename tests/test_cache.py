@@ -0,0 +1,86 @@
+import shutil
+import concurrent.futures
+
+import pytest
+
+from csvw.dsv import reader
+from pycldf.sources import Source, Sources
+
+from pytlopo.models import Volume
+from pytlopo.cache import fingerprint
+
+
+@pytest.fixture
+def make_volume(repos, tmp_path):
+    shutil.copytree(repos / 'raw' / 'vol1', tmp_path / 'raw' / 'vol1')
+
+    def make(**kw):
+        return Volume(
+            tmp_path / 'raw' / 'vol1',
+            {r['Name']: r for r in reader(repos / 'etc' / 'languages.csv', dicts=True)},
+            Source.from_bibtex('@book{vol1,\nauthor={A B},\ntitle={T}\n}'),
+            Sources.from_file(repos / 'etc' / 'sources.bib'),
+            **kw)
+    return make
+
+
+def test_Volume_cache(make_volume, tmp_path, mocker):
+    vol = make_volume(cache_dir=tmp_path / 'cache')
+    text = vol.chapters['1'].text
+    assert len(list(tmp_path.joinpath('cache').glob('vol1.volume.*.pickle'))) == 1
+
+    parse = mocker.patch.object(Volume, '_parse_blocks', side_effect=ValueError)
+    vol = make_volume(cache_dir=tmp_path / 'cache')
+    assert len(vol.reconstructions) == 3 and vol.chapters['1'].text == text
+    assert vol.chapters['1'].bib.id == 'tlopo1-1'
+    assert not parse.called
+
+
+def test_Volume_cache_invalidation(make_volume, tmp_path):
+    vol = make_volume(cache_dir=tmp_path / 'cache')
+    key = fingerprint(vol)
+    assert len(vol.igts) == 2
+
+    p = vol.dir / 'text.txt'
+    p.write_text(p.read_text(encoding='utf8').replace('__igt__\n  POc', '\n  POc'), encoding='utf8')
+    vol = make_volume(cache_dir=tmp_path / 'cache')
+    assert fingerprint(vol) != key
+    assert len(vol.igts) == 1
+    assert [p.stem for p in tmp_path.joinpath('cache').glob('*.volume.*.pickle')] == \
+        ['vol1.volume.{}'.format(fingerprint(vol))]
+
+
+def test_Volume_cache_incremental(make_volume, tmp_path, mocker):
+    p = tmp_path / 'raw' / 'vol1' / 'text.txt'
+    chapter = p.read_text(encoding='utf8')
+    chapter2 = chapter.replace('1 Introduction', '2 Chapter two').replace('\n1.', '\n2.')
+    p.write_text(chapter + '\n\n' + chapter2, encoding='utf8')
+
+    vol = make_volume(cache_dir=tmp_path / 'cache')
+    assert [eg.id for eg in vol.igts][-1] == '1-2-1-1-5-4'
+    assert len(list(tmp_path.joinpath('cache').glob('vol1.segment.*.pickle'))) == 2
+
+    # Remove an IGT from chapter 1:
+    p.write_text(
+        chapter.replace('__igt__\n  POc', '\n  POc') + '\n\n' + chapter2, encoding='utf8')
+    spy = mocker.spy(Volume, '_extract_blocks')
+    vol = make_volume(cache_dir=tmp_path / 'cache')
+    # The IGTs in chapter 2 are re-numbered:
+    assert [eg.id for eg in vol.igts][-1] == '1-2-1-1-5-3'
+    assert spy.call_count == 1 and spy.call_args[0][1][0] == '1 Introduction'
+    assert '1-2-1-1-5-3' in vol.chapters['2'].text
+    assert len(list(tmp_path.joinpath('cache').glob('vol1.segment.*.pickle'))) == 2
+
+    uncached = make_volume()
+    assert [r.id for r in uncached.reconstructions] == [r.id for r in vol.reconstructions]
+    assert [f.span for r in uncached.reconstructions for f in r.iter_forms()] == \
+        [f.span for r in vol.reconstructions for f in r.iter_forms()]
+    assert [eg.span for eg in uncached.igts] == [eg.span for eg in vol.igts]
+    assert uncached.chapters['2'].text == vol.chapters['2'].text
+
+    # On a cold cache, the blocks of all chapters are parsed with one process pool:
+    pool = mocker.spy(concurrent.futures, 'ProcessPoolExecutor')
+    vol = make_volume(cache_dir=tmp_path / 'cache2', workers=2)
+    assert [eg.id for eg in vol.igts] == [eg.id for eg in uncached.igts]
+    assert [eg.span for eg in vol.igts] == [eg.span for eg in uncached.igts]
+    assert pool.call_count == 1
@@ -0,0 +1,46 @@
+import pytest
+
+from pytlopo.config import *
+
+
+def test_Inventory():
+    inv = Inventory(['a', 'k', 'ŋʷ'])
+    assert 'ŋʷ' in inv and 'ŋ' not in inv
+    assert inv.invalid(['k', 'a', 'ŋ']) == ['ŋ']
+    assert inv.validate([['k', 'a'], ['ŋ', 'a', 'x']]) == {'ŋax': ['ŋ', 'x']}
+    assert PROTO_INVENTORIES['POc'].invalid(['k', 'a', 'ʔ', '-']) == ['ʔ']
+    assert 'ʔ' in REFLEX_INVENTORY
+
+
+@pytest.mark.parametrize(
+    'line,pl,relno',
+    [
+        ('PCP *fafa', 'PCP', None),
+        ('PCP/PPn *fafa', 'PCP/PPn', None),
+        ('(2) PEPn-Northern Outlier (N) *fafa', 'PEPn-Northern Outlier', '2'),
+        ('PCP/PPn', None, None),
+        ('PCPx *fafa', None, None),
+        ('  PCP *fafa', None, None),
+    ]
+)
+def test_match_proto(line, pl, relno):
+    m = match_proto(line)
+    assert (m.group('pl') if m else None) == pl
+    assert (m.group('relno') if m else None) == relno
+    assert bool(m) == bool(proto_pattern.match(line))
+
+
+@pytest.mark.parametrize(
+    'line,group',
+    [
+        ('  SHWNG: Ali *fafa', 'SHWNG'),
+        ('  SH : Ali *fafa', 'SH'),
+        ('  SHW: Ali *fafa', None),
+        ('SH: Ali *fafa', None),
+        ('  SH Ali', None),
+    ]
+)
+def test_match_witness(line, group):
+    m = match_witness(line)
+    assert (m.group(1) if m else None) == group
+    assert bool(m) == bool(witness_pattern.match(line))
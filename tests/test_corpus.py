@@ -0,0 +1,58 @@
+import shutil
+import pickle
+
+import pytest
+
+from csvw.dsv import reader
+from pycldf.sources import Source, Sources
+
+from pytlopo.corpus import Corpus
+from pytlopo.models import FORM_CACHE_SIZE
+
+
+@pytest.fixture
+def corpus_args(repos, tmp_path):
+    for num in [1, 2]:
+        shutil.copytree(repos / 'raw' / 'vol1', tmp_path / 'raw' / 'vol{}'.format(num))
+    return (
+        tmp_path / 'raw',
+        {r['Name']: r for r in reader(repos / 'etc' / 'languages.csv', dicts=True)},
+        Source.from_bibtex('@book{tlopo,\nauthor={A B},\ntitle={T}\n}'),
+        Sources.from_file(repos / 'etc' / 'sources.bib'),
+    )
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_Corpus(corpus_args, workers):
+    corpus = Corpus(*corpus_args, workers=workers)
+    assert list(corpus.volumes) == ['1', '2']
+    vol1, vol2 = corpus
+    assert vol2.bib.id == 'tlopo2' and corpus_args[2].id == 'tlopo'
+    assert len(vol2.reconstructions) == 3
+    assert [r.id for r in vol1.reconstructions] == \
+        [r.id.replace('2-', '1-', 1) for r in vol2.reconstructions]
+    assert list(vol2.chapters) == ['1'] and vol2.chapters['1'].bib.id == 'tlopo2-1'
+    assert [v.form_cache_size for v in Corpus(*corpus_args, form_cache_size=0)] == [0, 0]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_Corpus_metrics(corpus_args, workers):
+    corpus = Corpus(*corpus_args, workers=workers, metrics=True)
+    for vol in corpus:
+        assert vol.metrics.stages['Reconstruction.from_data'].objects == 3
+    assert corpus.metrics.stages['Reconstruction.from_data'].objects == 6
+    assert Corpus(*corpus_args, workers=1).metrics is None
+
+
+def test_Corpus_trace(corpus_args):
+    corpus = Corpus(*corpus_args, workers=2, trace=True)
+    assert {e['name'] for e in corpus.tracer.events} >= {'volume 1', 'volume 2', 'etymon'}
+    assert Corpus(*corpus_args, workers=1).tracer is None
+
+
+def test_Volume_pickle(volume1):
+    vol = pickle.loads(pickle.dumps(volume1))
+    assert vol.bib.id == volume1.bib.id and vol.bib['title'] == volume1.bib['title']
+    assert vol.form_cache_size == volume1.form_cache_size == FORM_CACHE_SIZE
+    chapter = pickle.loads(pickle.dumps(volume1.chapters['1']))
+    assert chapter.text == volume1.chapters['1'].text
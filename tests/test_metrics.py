@@ -0,0 +1,25 @@
+from pytlopo.metrics import Metrics
+
+
+def test_Metrics():
+    def gen():
+        x = yield 1
+        assert x == 'a'
+        yield 2
+        return 'done'
+
+    m = Metrics()
+    g = m.timed('stage', gen(), lines=5)
+    assert next(g) == 1 and g.send('a') == 2
+    try:
+        next(g)
+    except StopIteration as e:
+        assert e.value == 'done'
+    assert list(m.counted('other', ['x', 'y'])) == ['x', 'y']
+    with m.timer('other', objects=3):
+        pass
+    m.update(m)
+    stage, other = m.report()
+    assert stage['calls'] == 2 and stage['lines'] == 10 and stage['objects'] == 4
+    assert other['calls'] == 2 and other['lines'] == 4 and other['objects'] == 6
+    assert 'lines/s' in str(m)
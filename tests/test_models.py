@@ -146,6 +146,18 @@ def test_Reflex(volume1, text, assertion):
     assert str(ref)
 
 
+def test_Reflex_compact(volume1):
+    import sys
+    import pickle
+
+    ref = Reflex.from_line(volume1, "Adm: Language form (N) 'gloss'")
+    assert ref.lang is sys.intern('Language') and ref.glosses[0].pos is sys.intern('N')
+    if sys.version_info >= (3, 10):
+        assert not hasattr(ref, '__dict__')
+    ref2 = pickle.loads(pickle.dumps(ref))
+    assert ref2 == ref and ref2.group is ref.group and ref2.glosses[0].pos == 'N'
+
+
 def test_Reflex_with_bad_form(volume1):
     with pytest.raises(ValueError):
         Reflex.from_line(volume1, " Adm: Language form1 'gloss'")
@@ -197,6 +209,132 @@ PMP *mata 'eye'
     assert str(rec)
 
 
+def test_Volume_match_language(volume1):
+    assert volume1.match_language('Language (Adm)', group='Adm')[2] == ' (Adm)'
+    assert volume1.match_language('POc *mata')[:2] == ('POc', None)
+    assert volume1.match_language('PCP/PPn *mata')[0] == 'PCP/PPn'
+    assert volume1.match_language('Unknown') is None
+    with pytest.raises(AssertionError):
+        volume1.match_language('Language', group='NNG')
+
+
+def test_Volume_match_ref(volume1):
+    assert volume1.match_ref('Author 2000') == ('bibkey', None)
+    assert volume1.match_ref('(after Author 2001: 12-15)') == ('bibkey2', '12-15')
+    assert volume1.match_ref('Other 2000') is None
+    hits = volume1._match_ref.cache_info().hits
+    assert volume1.match_ref('Author 2000') == ('bibkey', None)
+    assert volume1._match_ref.cache_info().hits == hits + 1
+
+
+@pytest.mark.parametrize(
+    'text,replacement',
+    [
+        ('see Author 2000.', 'see [Author 2000](Source#cldf:bibkey).'),
+        ('see Author (2000)', 'see [Author](Source#cldf:bibkey) ([2000](Source#cldf:bibkey))'),
+        ('see Other 2000.', 'see Other 2000.'),
+    ]
+)
+def test_Volume_replace_refs(volume1, text, replacement):
+    assert volume1.replace_refs(text) == replacement
+
+
+def test_Volume_workers(volume1, repos):
+    from csvw.dsv import reader
+    from pycldf.sources import Source, Sources
+
+    vol = Volume(
+        repos / 'raw' / 'vol1',
+        {r['Name']: r for r in reader(repos / 'etc' / 'languages.csv', dicts=True)},
+        Source.from_bibtex('@book{vol1,\nauthor={A B},\ntitle={T}\n}'),
+        Sources.from_file(repos / 'etc' / 'sources.bib'),
+        workers=2,
+    )
+    assert [r.id for r in vol.reconstructions] == [r.id for r in volume1.reconstructions]
+    assert vol.reconstructions[-1].disambiguation == 'b'
+    assert vol.chapters['1'].text == volume1.chapters['1'].text
+
+
+def test_Volume_parse_form(volume1):
+    vol = Volume(volume1.dir, volume1.langs, volume1._bib, volume1.sources, form_cache_size=0)
+    assert vol.parse_form(Protoform, "POc *mata 'eye'") is not vol.parse_form(
+        Protoform, "POc *mata 'eye'")
+    assert vol.form_cache_info().hits == 0 and vol.form_cache_info().misses == 2
+
+    vol = Volume(volume1.dir, volume1.langs, volume1._bib, volume1.sources)
+    pf = vol.parse_form(Protoform, "POc *mata 'eye'")
+    pf.line = 5
+    pf.glosses[0].sources.append(Reference('id', 'label'))
+    pf2 = vol.parse_form(Protoform, "POc *mata 'eye'")
+    assert pf2.forms == pf.forms and pf2 is not pf and pf2.line is None
+    assert pf2.glosses[0] is not pf.glosses[0] and not pf2.glosses[0].sources
+    assert vol.parse_form(Reflex, " Adm: Language form 'gloss'", subgroup='x').subgroup == 'x'
+    assert vol.form_cache_info().hits == 1 and vol.form_cache_info().misses == 2
+    assert vol.reconstructions and vol.form_cache_info().hits > 1
+
+
+def test_Volume_parse(volume1):
+    vol = Volume(volume1.dir, volume1.langs, volume1._bib, volume1.sources)
+    res = vol.parse(chapters=[1])
+    assert [r.id for r in res['reconstructions']] == [r.id for r in volume1.reconstructions]
+    assert [r.span for r in res['reconstructions']] == [r.span for r in volume1.reconstructions]
+    assert [eg.id for eg in res['igts']] == [eg.id for eg in volume1.igts]
+    assert not vol.parse(chapters=[2])['reconstructions']
+
+    page = volume1.igts[-1].page
+    res = vol.parse(pages=(page, page))
+    assert [eg.id for eg in res['igts']] == [eg.id for eg in volume1.igts if eg.page == page]
+    assert 'reconstructions' not in vol.__dict__
+
+
+def test_Volume_objects_at(volume1):
+    lines = volume1.dir.joinpath('text.txt').read_text(encoding='utf8').split('\n')
+    rec = volume1.reconstructions[0]
+    start, end = rec.span
+    assert lines[start] == '<' and lines[end - 1] == '>'
+    assert volume1.objects_at(start) == [rec]
+    pf = rec.reflexes[0]
+    assert volume1.objects_at(pf.line) == [rec, pf]
+    assert lines[pf.line].startswith(pf.lang)
+    assert pf.span == (pf.line, pf.line + 1)
+    fg = volume1.formgroups[0]
+    assert all(lines[f.line].strip().startswith(f.group) for f in fg.forms)
+    assert volume1.objects_at(0) == []
+    # Provenance is not part of the constructor signatures or reprs:
+    assert Protoform('POc', ['a'], [], None, None, None, 'comment').comment == 'comment'
+    assert 'span' not in repr(rec) and 'line=' not in repr(pf)
+
+
+
+@pytest.mark.parametrize('stream', [True, False])
+def test_Volume_metrics(volume1, stream):
+    vol = Volume(volume1.dir, volume1.langs, volume1._bib, volume1.sources, metrics=True)
+    if stream:
+        assert len(list(vol.iter_objects())) == 7
+    else:
+        assert vol.chapters
+    stages = {s['name']: s for s in vol.metrics.report()}
+    assert stages['extract_blocks']['lines'] == 61 and stages['extract_blocks']['objects'] == 7
+    assert stages['Reconstruction.from_data']['objects'] == 3
+    assert ('replace_refs' in stages) != stream
+    assert volume1.metrics is None
+
+
+def test_Volume_iter_objects(volume1):
+    import pickle
+
+    vol = pickle.loads(pickle.dumps(volume1))
+    objs = list(vol.iter_objects())
+    assert [o.id for o in objs if isinstance(o, Reconstruction)] == \
+        [r.id for r in volume1.reconstructions]
+    assert [o.id for o in objs if isinstance(o, ExampleGroup)] == [e.id for e in volume1.igts]
+    assert len(objs) == 7 and vol._links is None and 'reconstructions' not in vol.__dict__
+
+    assert len(list(vol.iter_reconstructions(keep_lines=True))) == 3
+    assert vol.chapters['1'].text == volume1.chapters['1'].text
+    assert 'reconstructions' not in vol.__dict__
+
+
 def test_Volume(volume1):
     assert len(volume1.chapters) == 1
     assert len(volume1.reconstructions) == 3
@@ -15,3 +15,17 @@ from pytlopo.parser.forms import *
 )
 def test_iter_graphemes(form, graphemes):
     assert list(iter_graphemes(form)) == graphemes
+
+
+def test_graphemes():
+    assert graphemes('aɛ̃a') == ('a', 'ɛ̃', 'a')
+    assert graphemes('aɛ̃a') is graphemes('aɛ̃a')
+
+
+def test_char_class():
+    from pytlopo.parser.forms import char_class, CHAR_CLASSES, MODIFIER, COMBINING, BASE
+
+    assert char_class('ʰ') == (MODIFIER, False)
+    assert char_class('̃') == (COMBINING, False)
+    assert 'Ж' not in CHAR_CLASSES
+    assert char_class('Ж') == (BASE, False) and 'Ж' in CHAR_CLASSES
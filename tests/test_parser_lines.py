@@ -16,8 +16,64 @@ def test_make_paragraph(i, o, tmp_path):
     assert o(make_paragraph(i, tmp_path / 'vol1'))
 
 
+@pytest.mark.parametrize(
+    'line,res',
+    [
+        ('Plain text', None),
+        ('###newpage###12 Page', (None, '12')),
+        ('\x0c Page 12', (None, '12')),
+        ('\x0c Page 12 and more', None),
+        ('3 Chapter', (('3',), 'Chapter')),
+        ('3. ‘Quoted', (('3',), '‘Quoted')),
+        ('3.1 Section', (('3', '1'), 'Section')),
+        ('3 1. Section', (('3', '1'), 'Section')),
+        ('3.1 2 Section', (('3', '1', '2'), 'Section')),
+        ('3.1.2 mu', (('3', '1', '2'), 'mu')),
+        ('3.1 mu', None),
+        ('3.1.2.4 *fafa', (('3', '1', '2', '4'), '*fafa')),
+        ('3.1.2.4.5 _Title', (('3', '1', '2', '4', '5'), '_Title')),
+        ('3.1.2.4.5.6 Title', None),
+        ('3.1.2 1990', None),
+    ]
+)
+def test_classify_line(line, res):
+    assert classify_line(line) == res
+
+
+@pytest.mark.parametrize(
+    'line,kind',
+    [
+        ('', EMPTY),
+        ('Plain text', PROSE),
+        ('###newpage###12 Page', PAGE),
+        ('3.1 Section', HEADING),
+        ('__igt__', DIRECTIVE),
+        ('<', DIRECTIVE),
+        ('  cf. also: POc', CF),
+        ("POc *mata 'eye'", PROTO),
+        (' Adm: Language word', WITNESS),
+        ('-Adm', SUBGROUP),
+    ]
+)
+def test_tag_line(line, kind):
+    assert tag_line(line)[0] == kind
+    assert (kind in FORMS_LINE_KINDS) == bool(is_forms_line(line))
+
+
+def test_LineTags():
+    tags = LineTags(['1 Chapter', '', '###newpage###7 Page', 'text'])
+    assert list(tags.kinds) == [HEADING, EMPTY, PAGE, PROSE]
+    assert tags.fields == {0: (('1',), 'Chapter'), 2: (None, '7')}
+    assert tags[2:].fields == {0: (None, '7')} and len(tags[2:]) == 2
+
+    tagged = LineTags()
+    for i, _ in enumerate(tagged.tagged(['1 Chapter', '', '###newpage###7 Page', 'text'])):
+        assert len(tagged) == i + 1
+    assert tagged.kinds == tags.kinds and tagged.fields == tags.fields
+
+
 def test_iter_chapters(tmp_path):
-    chapters = list(iter_chapters("""\
+    lines = """\
 
 1 Chapter
 
@@ -64,7 +120,9 @@ item
 2 Next chapter
 
 
-""".split('\n'), tmp_path))
+""".split('\n')
+    chapters = list(iter_chapters(lines, tmp_path))
+    assert list(iter_chapters(lines, tmp_path, tags=LineTags(lines))) == chapters
     inchapter, text, toc = chapters[0]
     assert inchapter
     assert 'merge lines' in text, 'Lines in regular parapgraph not concatenated'
@@ -79,3 +137,79 @@ item
     assert '> First quote' in text
     assert '> Second quote' in text
     assert 'table-1' in text, 'Table caption not recognized'
+
+
+def test_extract_all_blocks():
+    text = """\
+1 Chapter
+
+1.1 Section
+
+__igt__
+a b
+A B
+'x'
+
+<
+POc *mata 'eye'
+>
+
+__formgroup__
+ Adm: Language word
+""".split('\n')
+    blocks = extract_all_blocks(text)
+    kinds, links, kind = [], [], next(blocks)
+    while True:
+        kinds.append(kind[0])
+        links.append(kind[-1] + (kind[0].upper(),))
+        assert kind[2] == ('1', 'Section')
+        try:
+            kind = blocks.send(kind[0].upper())
+        except StopIteration as e:
+            lines = e.value
+            break
+    assert kinds == ['igt', 'etymon', 'formgroup']
+    assert [line for line in lines if line.isupper()] == ['IGT', 'ETYMON', 'FORMGROUP']
+
+    rewritten, tags = replace_blocks(text, LineTags(text), links)
+    assert list(rewritten) == lines
+    assert tags.kinds == LineTags(lines).kinds and tags.fields == LineTags(lines).fields
+
+
+def test_split_chapters():
+    chunks = split_chapters("""\
+Preamble
+1 Chapter
+###newpage###7 Page
+
+<
+2 Not a chapter
+>
+2 Chapter""".split('\n'))
+    assert [(pageno, chunk[0]) for pageno, chunk in chunks] == \
+        [(-1, 'Preamble'), (-1, '1 Chapter'), (7, '2 Chapter')]
+    lines = [line for _, chunk in chunks for line in chunk]
+    assert split_chapters(lines, tags=LineTags(lines)) == chunks
+    assert [(start, first, last, counts['etymon'])
+            for start, _, first, last, counts in index_chapters(lines)] == \
+        [(0, -1, -1, 0), (1, -1, 7, 0), (7, 7, 7, 1)]
+
+
+@pytest.mark.parametrize('text', ['', 'a', 'a\n', 'a\r\nb\n\n', '\x0c1 x\n\nb'])
+def test_iter_lines(tmp_path, text):
+    p = tmp_path / 'text.txt'
+    p.write_bytes(text.encode('utf8'))
+    assert list(iter_lines(p)) == p.read_text(encoding='utf8').split('\n')
+
+
+@pytest.mark.parametrize('text', ['', 'a', 'a\n', 'a\r\nb\n\n', 'ä\rö\r\r\n', '\x0c1 x\n\nb'])
+def test_LineIndex(tmp_path, text):
+    p = tmp_path / 'text.txt'
+    p.write_bytes(text.encode('utf8'))
+    lines = p.read_text(encoding='utf8').split('\n')
+    with LineIndex(p) as index:
+        assert len(index) == len(lines)
+        assert list(index) == index[:] == lines
+        assert index[-1] == lines[-1]
+        start, end = index.span(0)
+        assert text.encode('utf8')[start:end].decode('utf8') == lines[0]
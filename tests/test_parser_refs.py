@@ -43,3 +43,35 @@ def test_search_with_pages():
 def test_repl_ref(text, replacement):
     p = key_to_regex('Meier 2011')
     assert repl_ref('srcid', p.search(text)) == replacement
+
+
+@pytest.mark.parametrize(
+    'key,index',
+    [
+        ('Meier and Müller 1911', 'Meier'),
+        ("d'Urville 1833", 'd'),
+        ('ACD', 'ACD'),
+        ('A.B', None),
+        ('', None),
+    ]
+)
+def test_index_key(key, index):
+    assert index_key(key) == index
+
+
+def test_citation_index_keys():
+    assert citation_index_keys('(Meier 2011)') == {'Meier'}
+    assert citation_index_keys('(after Meier 2011)') == {'after', 'Meier'}
+
+
+@pytest.mark.parametrize(
+    'key,mention',
+    [
+        ('Meier and Müller 1911', 'Meier'),
+        ('ACD', 'ACD'),
+        ('A.B', None),
+        ('& Müller 1911', None),
+    ]
+)
+def test_mention_key(key, mention):
+    assert mention_key(key) == mention
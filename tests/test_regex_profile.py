@@ -0,0 +1,26 @@
+import re
+
+from pytlopo import config
+from pytlopo.parser import lines
+from pytlopo.models import Volume
+from pytlopo.regex_profile import profile_patterns
+
+
+def test_profile_patterns(volume1):
+    vol = Volume(volume1.dir, volume1.langs, volume1._bib, volume1.sources)
+    with profile_patterns() as profile:
+        assert not isinstance(config.proto_pattern, re.Pattern)
+        assert lines.fn_pattern is config.fn_pattern
+        assert vol.chapters
+        assert [m.group() for m in config.fn_pattern.finditer('a[1] b[2]')] == ['[1]', '[2]']
+        assert config.fn_pattern.sub('', 'a[1]') == 'a'
+        assert config.fn_pattern.split('a') == ['a']
+    assert isinstance(config.proto_pattern, re.Pattern)
+    assert isinstance(lines.fn_pattern, re.Pattern)
+
+    stats = {s['name']: s for s in profile.report()}
+    assert stats['config.proto_pattern']['hits'] == 7  # Repeated protoform lines are memoized.
+    assert stats['config.proto_pattern']['calls'] == \
+        stats['config.proto_pattern']['hits'] + stats['config.proto_pattern']['misses']
+    assert stats['config.fn_pattern']['hits'] >= 2
+    assert 'µs/call' in str(profile)
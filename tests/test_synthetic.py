@@ -0,0 +1,27 @@
+from csvw.dsv import reader
+from pycldf.sources import Source, Sources
+
+from pytlopo.corpus import Corpus
+from pytlopo.synthetic import generate
+
+
+def test_generate(tmp_path):
+    counts = generate(tmp_path / 'a', seed=3, volumes=2, languages=50, sources=20)
+    assert counts == generate(tmp_path / 'b', seed=3, volumes=2, languages=50, sources=20)
+    for p in ['etc/languages.csv', 'etc/sources.bib', 'raw/vol2/md.json', 'raw/vol2/text.txt']:
+        assert tmp_path.joinpath('a', p).read_text(encoding='utf8') == \
+            tmp_path.joinpath('b', p).read_text(encoding='utf8')
+
+    corpus = Corpus(
+        tmp_path / 'a' / 'raw',
+        {r['Name']: r for r in reader(tmp_path / 'a' / 'etc' / 'languages.csv', dicts=True)},
+        Source.from_bibtex('@book{tlopo,\nauthor={A B},\ntitle={T}\n}'),
+        Sources.from_file(tmp_path / 'a' / 'etc' / 'sources.bib'),
+        workers=1,
+    )
+    assert sum(len(vol.reconstructions) for vol in corpus) == counts['etyma']
+    assert sum(len(vol.igts) for vol in corpus) == counts['igts']
+    assert sum(len(vol.formgroups) for vol in corpus) == counts['formgroups']
+    assert sum(len(vol.chapters) for vol in corpus) == counts['chapters'] == 18
+    assert any(
+        'Source#cldf:' in chapter.text for vol in corpus for chapter in vol.chapters.values())
@@ -0,0 +1,31 @@
+import json
+import collections
+
+from pytlopo.trace import Tracer
+from pytlopo.models import Volume
+
+
+def test_Tracer(tmp_path):
+    tracer = Tracer()
+    with tracer.span('outer', x=1, y=None):
+        with tracer.span('inner', cat='test'):
+            pass
+    inner, outer = tracer.events
+    assert outer['args'] == {'x': 1} and inner['cat'] == 'test'
+    assert outer['ts'] <= inner['ts'] and inner['dur'] <= outer['dur']
+    tracer.dump(tmp_path / 'trace.json')
+    events = json.loads(tmp_path.joinpath('trace.json').read_text(encoding='utf8'))['traceEvents']
+    assert [e['ph'] for e in events] == ['M', 'X', 'X']
+    assert len(tracer.pop()) == 2 and not tracer.events
+
+
+def test_Volume_trace(volume1):
+    vol = Volume(
+        volume1.dir, volume1.langs, volume1._bib, volume1.sources, workers=2, trace=True)
+    assert 'trace' in vol.results()
+    names = collections.Counter(e['name'] for e in vol.tracer.events)
+    assert names['etymon'] == 3 and names['igt'] == 2 and names['extract_blocks'] == 1
+    assert names['render chapter 1'] == 1 and names['volume 1'] == 1
+    pids = {e['pid'] for e in vol.tracer.events if e['cat'] == 'block'}
+    assert vol.tracer.events[0]['pid'] not in pids
+    assert volume1.tracer is None
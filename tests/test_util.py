@@ -1,6 +1,8 @@
 import pytest
 
-from pytlopo.util import variants, strip_morphemeseparator
+from pytlopo.util import (
+    variants, count_variants, iter_variants, strip_morphemeseparator, Trie,
+)
 
 
 @pytest.mark.parametrize(
@@ -37,3 +39,27 @@ def test_strip_morphemeseparator(form, res):
 )
 def test_variants(form, var):
     assert set(variants(form)) == set(var)
+    assert count_variants(form) == len(var)
+    assert sorted(iter_variants(form)) == sorted(var)
+
+
+def test_variants_ambiguous():
+    with pytest.raises(AssertionError):
+        variants('a(b)(b)')
+
+
+def test_Trie():
+    trie = Trie({'a': 1, 'ab': 2, 'abcd': 3})
+    assert trie.longest_prefix('abc') == ('ab', 2)
+    assert trie.longest_prefix('abcde') == ('abcd', 3)
+    assert trie.longest_prefix('b') is None
+    assert 'ab' in trie and 'abc' not in trie
+
+
+def test_Trie_regex_and_prefixes():
+    import re
+
+    trie = Trie({'M': 1, 'Mei': 2, 'Meier': 3, 'Müller': 4})
+    assert re.match(trie.regex(), 'Meierx').group() == 'Meier'
+    assert re.match(trie.regex(), 'Mx').group() == 'M'
+    assert [k for k, _ in trie.prefixes('Meier')] == ['M', 'Mei', 'Meier']